@@ -1,7 +1,4 @@
-from functools import partial
-from collections import OrderedDict, defaultdict
-import random
-import time
+from collections import OrderedDict
 
 from cymunk import Vec2d
 from kivy.app import App
@@ -12,15 +9,22 @@ from kivy.logger import Logger
 from kivy.properties import NumericProperty, ObjectProperty
 
 from anim import AnimObject, ClockStopper, PhysicsObject
-from baloon import Baloon, PointsBaloon
+import assets
+from baloon import Baloon
+import bfs
 from cannon import Cannon
 import defs
-from element import Element, load_elmap
+import effects
+from element import Element
+from replay import Recording
+import spritebatch
 from ui import IntroLabel
 from wizard import Wizard
 from other import GameOver, Hint, Success
 from snd import Sounds
+import timing
 from utils import adhoco
+from world import World
 
 
 class AlcanGame(ClockStopper, PhysicsObject):
@@ -30,23 +34,51 @@ class AlcanGame(ClockStopper, PhysicsObject):
     points = NumericProperty(0)
     stacklayout = ObjectProperty()
 
-    def __init__(self, *args, **kwargs):
-
+    def __init__(self, *args, level='medium', difficulty=None, seed=None, replay=None, autorun=True,
+                 **kwargs):
+        """
+            level - name of difficulty level, see defs.LEVELS
+            difficulty - dict of parameters of level to change, see defs.DIFFICULTY
+            seed - of game's random numbers, random if None
+            replay - Recording to play instead of player's input
+            autorun - update game by kivy clock, else somebody calls update()
+        """
+        # game objects use world's clock and random numbers, so game can be replayed
+        self.world = World(level, seed, difficulty)
+        self.replay = replay
+        self.recording = Recording(self.world.seed, level)
+        self.inputs = []  # (action, value) for next physics step
+        self.step_no = 0
+        Logger.info("game: level=%s seed=%s replay=%s", level, self.world.seed, replay is not None)
+
+        # kv children are added before their properties are set, they are attached at the end
+        self.attach_added = False
         super(AlcanGame, self).__init__(*args, **kwargs)
 
-        self.oo_to = adhoco(remove=set(), add=[])
+        self.oo_to = adhoco(remove=[], add=[])
+        self.contacts = []  # (reaction, object, other object) recorded during physics step
+        self.removed = set()  # objects removed from space, whose recorded contacts are dropped
+        self.animated = set()  # objects playing animation, eg. floating baloons
+        self.element_batch = None
+        if defs.batch_elements:
+            # drawn after game's own canvas and widgets from kv rule, below widgets added later
+            self.element_batch = spritebatch.ElementBatch()
+            self.canvas.add(self.element_batch.context)
+        self.effects = effects.Effects(self.get_time)
+        self.canvas.after.add(self.effects.context)  # above everything
         self.elements_in_zone = []
         self.keys_pressed = set()
         self.game_is_over = False
         self.visible_hints = OrderedDict()
-        self.hints_stats = defaultdict(lambda: 0)
+        self.planner = bfs.Planner(bfs.solver(), self.world.discovery.available_elnames)
         self.skip_drop = False
         self.touch_phase = None
-        self.left_beam_time = time.time()
+        self.left_beam_time = self.get_time()
 
         EventLoop.window.bind(on_key_down=self.on_key_down, on_key_up=self.on_key_up)
 
-        self.schedule_interval(self.update, 1.0 / defs.fps)
+        if autorun:
+            self.world.clocks.append(Clock.schedule_interval(self.update, 1.0 / defs.fps))
 
         # collision handlers
         self.space.add_collision_handler(Wizard.collision_type,
@@ -67,49 +99,88 @@ class AlcanGame(ClockStopper, PhysicsObject):
                                          self.wizard_vs_bottom)
 
         Window.bind(on_resize=self.on_resize)
-        self.set_bfs()
+        self.bfs = self.planner.remaining
         self.trigger_resize()
+        self.left_beam.center_x += self.world.difficulty.left_beam_fine_pos
+
+        for x in reversed(self.children):
+            if isinstance(x, AnimObject):
+                x.attach()
+        self.attach_added = True
+
+    def add_widget(self, widget, *args, **kwargs):
+        if isinstance(widget, AnimObject) and widget.world is None:
+            widget.world = self.world  # eg. object of kv rule
+        super(AlcanGame, self).add_widget(widget, *args, **kwargs)
+        if self.attach_added and isinstance(widget, AnimObject):
+            self.world.when_unlocked(widget.attach)  # its body is added to space
+
+    def on_parent(self, __instance, parent):
+        if parent:
+            self.attach()
 
     def clear(self):
-        self.stop_all_clocks()
+        if defs.record_dir and self.replay is None:
+            self.recording.steps = self.step_no
+            self.recording.final = self.snapshot()
+            Logger.info("game: recorded to %s", self.recording.save_to_dir(defs.record_dir))
+
         EventLoop.window.funbind('on_key_down', self.on_key_down)
         EventLoop.window.funbind('on_key_up', self.on_key_up)
+        Window.unbind(on_resize=self.on_resize)
         for x in self.children[:]:
             if isinstance(x, AnimObject):
                 self.remove_widget(x)
-        self.del_physics()
+        self.world.close()
+        assets.log_stats()
+
+    def snapshot(self):
+        """ state of game after last physics step, the same in replay of its recording """
+        def at(body):
+            x, y = body.position
+            return round(x, 3), round(y, 3)
+
+        return {
+            'step': self.step_no,
+            'points': self.points,
+            'game_over': self.game_is_over,
+            'available': sorted(self.world.discovery.available_elnames),
+            'wizard': at(self.wizard.body),
+            'elements': sorted((e.elname, e.activated) + at(e.body) for e in self.elements_in_zone),
+        }
 
     def gameover(self):
         if self.game_is_over:
             return
         self.game_is_over = True
+        timing.dump()
+        assets.log_stats()
         __mw, mh = defs.map_size
-        self.add_widget(GameOver(pos=(400, mh), size=(600, 150)))
-        App.get_running_app().sm.schedule_gameover()
+        wi = GameOver(pos=(400, mh), size=(600, 150), points=self.points)
+        self.bind(points=wi.setter('points'))
+        self.add_widget(wi)
+        self.schedule_gameover()
+
+    def schedule_gameover(self):
+        """ let app return to main screen (there is no app when running headless) """
+        app = App.get_running_app()
+        if app:
+            app.sm.schedule_gameover()
 
     def on_init(self):
-        self.add_widget(Baloon(center=(300, 300), object_to_follow=self.wizard,
-                               text="Alchemist"))
-        self.schedule_once(lambda dt: self.add_widget(Baloon(center=(400, 300), size=(200, 50),
-                                                      object_to_follow=self.cannon,
-                                                      text="Large Elements Collider")), 3)
+        self.add_widget(Baloon.acquire(self.world, center=(300, 300), object_to_follow=self.wizard,
+                                       text="Alchemist"))
+        self.schedule_once(lambda dt: self.add_widget(Baloon.acquire(self.world, center=(400, 300), size=(200, 50),
+                                                              object_to_follow=self.cannon,
+                                                              text="Large Elements Collider")), 3)
 
     def schedule_add_widget(self, oclass, *oargs, **okwargs):
         self.oo_to.add.append((oclass, oargs, okwargs))
 
-    def set_bfs(self):
-        self.hints_to_show = Element.steps_to_reach()
-        self.bfs = len(self.hints_to_show)
-
     def set_hint(self, a, b, c):
-        if (a, b) in self.visible_hints:
-            return False
-
-
         hint = Hint()
         self.stacklayout.add_widget(hint)
         self.visible_hints[a, b] = hint
-        self.hints_stats[a, b] += 1
         hint.a = a
         hint.b = b
         hint.c = c
@@ -118,36 +189,30 @@ class AlcanGame(ClockStopper, PhysicsObject):
             (a, b), hint = self.visible_hints.popitem(0)
             self.stacklayout.remove_widget(hint)
 
-        return True
-
-
-
     def rotate_hint(self):
-        """ calculate hint for new element appeared """
-        available_elements = Element.available_elnames
-
-        possible_combinations = []
-        elmap = load_elmap()
-        for (a, b) in self.hints_to_show:
-            c = elmap[a, b]
-            possible_combinations.append((a, b, c))
-
-        possible_combinations.sort(key=lambda x: self.hints_stats[x[0], x[1]])
-
-        for a, b, c in possible_combinations:
-            if self.set_hint(a, b, c):
-                break
+        """ show next hint of plan to reach dragon """
+        hint = self.planner.pop_hint(visible=self.visible_hints)
+        if hint:
+            self.set_hint(*hint)
 
     def remove_obj(self, obj, __dt=None, just_schedule=True):
         if just_schedule:
-            self.oo_to.remove.add(obj)
+            if obj not in self.oo_to.remove:
+                self.oo_to.remove.append(obj)
             return
         Logger.info("game: remove object obj=%s", obj)
         obj.before_removing()
-        self.space.remove(obj.body)
-        self.space.remove(obj.shape)
+        if obj.physical:
+            self.space.remove(obj.body)
+            self.space.remove(obj.shape)
+            del self.bodyobjects[obj.body]
+            self.entities.remove(obj.slot)
+            self.removed.add(obj)
+            if obj in self.wizard.touching_elements:
+                self.wizard.touching_elements.remove(obj)
+        self.animated.discard(obj)
         self.remove_widget(obj)
-        del self.bodyobjects[obj.body]
+        obj.release()
 
     def replace_objs(self, As, BClass, *Bargs, **Bkwargs):
         massum = 0.0
@@ -157,87 +222,180 @@ class AlcanGame(ClockStopper, PhysicsObject):
             momentum += x.body.velocity * x.body.mass
             Logger.debug("momentum is %s after adding mass=%s vel=%s", momentum, x.body.velocity, x.body.mass)
             self.remove_obj(x)
-        Bkwargs['pos'] = As[0].pos
-        Bkwargs['size'] = As[0].size
+        # from physics, widget is interpolated between steps and depends on frame rate
+        x, y = As[0].body.position
+        radius = As[0].shape.radius
+        Bkwargs['pos'] = (x - radius, y - radius)
+        Bkwargs['size'] = (2 * radius, 2 * radius)
         Bkwargs['momentum'] = momentum / len(As)  # I have no idea why I should divide it by number of As. 
         #  Afair it should work well without dividing, 
 
         self.schedule_add_widget(BClass, *Bargs, **Bkwargs)
 
+    def contact(self, arbiter, first_type):
+        """ game objects of colliding shapes, the one of first_type first
+            (None for walls, which are not game objects) """
+        s1, s2 = arbiter.shapes
+        if s1.collision_type != first_type:
+            s1, s2 = s2, s1
+        return self.bodyobjects.get(s1.body), self.bodyobjects.get(s2.body)
+
+    def forget_removed(self):
+        """ drop contacts recorded with removed objects (also by separate
+            callbacks their removal just fired), in one pass. Removed object
+            must not react once it's released and maybe recycled into another
+            one, so this is done before objects are added again """
+        if self.removed:
+            removed = self.removed
+            self.contacts = [c for c in self.contacts if c[1] not in removed and c[2] not in removed]
+            removed.clear()
+
+    def is_consumed(self, obj):
+        """ obj is being removed, it doesn't react anymore """
+        return obj in self.oo_to.remove
+
+    # collision handlers, called by space during step. They only record contact,
+    # reactions are done by resolve_contacts after step
+
     def wizard_vs_element(self, __space, arbiter):
         """ collision handler - wizard vs element """
-        wizard, element = [self.bodyobjects[s.body] for s in arbiter.shapes]
-
-        if isinstance(wizard, Element):
-            wizard, element = element, wizard
-
-        wizard.touching_elements.append(element)
+        wizard, element = self.contact(arbiter, Wizard.collision_type)
+        self.contacts.append((self.wizard_touches, wizard, element))
 
         if wizard.carried_elements:
             return True
 
-        self.schedule_once(partial(wizard.carry_element, element))
-
     def wizard_vs_element_end(self, __space, arbiter):
-        wizard, element = [self.bodyobjects[s.body] for s in arbiter.shapes]
+        wizard, element = self.contact(arbiter, Wizard.collision_type)
+        self.contacts.append((self.wizard_untouches, wizard, element))
 
-        if isinstance(wizard, Element):
-            wizard, element = element, wizard
+    def cannon_vs_element(self, __space, arbiter):
+        cannon, element = self.contact(arbiter, Cannon.collision_type)
+        self.contacts.append((self.cannon_loads, cannon, element))
 
-        wizard.touching_elements.remove(element)
+        if cannon.bullets:
+            return True  # cannot hold more than one bullet
 
-        if not wizard.carried_elements and wizard.touching_elements:
-            self.schedule_once(partial(wizard.carry_element, wizard.touching_elements[0]))
+    def element_vs_bottom(self, __space, arbiter):
+        element, __bottom = self.contact(arbiter, Element.collision_type)
+        self.contacts.append((self.element_falls, element, None))
 
-    def cannon_vs_element(self, __space, arbiter):
-        cannon, element = [self.bodyobjects[s.body] for s in arbiter.shapes]
+    def element_vs_element(self, __space, arbiter):
+        e1, e2 = self.contact(arbiter, Element.collision_type)
+        self.contacts.append((self.elements_meet, e1, e2))
+        return True
 
-        if isinstance(cannon, Element):
-            cannon, element = element, cannon
+    def wizard_vs_bottom(self, __space, arbiter):
+        wizard, __bottom = self.contact(arbiter, Wizard.collision_type)
+        self.contacts.append((self.wizard_falls, wizard, None))
+
+    @timing.timed('collision.resolve')
+    def resolve_contacts(self):
+        """ react to contacts recorded during physics step, in order, and once
+            for each pair even if it touched more times """
+        contacts, self.contacts = self.contacts, []
+        done = set()
+        for contact in contacts:
+            if contact in done:
+                continue
+            done.add(contact)
+            reaction, a, b = contact
+            reaction(a, b)
+
+    # reactions to contacts
+
+    @timing.timed('collision.wizard_touches')
+    def wizard_touches(self, wizard, element):
+        if self.is_consumed(element):
+            return
+        wizard.touching_elements.append(element)
 
-        if cannon.bullets:
-            return True  # cannot hold more than one bullet
+        if not wizard.carried_elements:
+            wizard.carry_element(element)
 
-        self.schedule_once(partial(cannon.carry_element, element))
+    @timing.timed('collision.wizard_untouches')
+    def wizard_untouches(self, wizard, element):
+        if element in wizard.touching_elements:
+            wizard.touching_elements.remove(element)
 
-    def element_vs_bottom(self, __space, arbiter):
-        e, bo = arbiter.shapes
-        if e.collision_type == defs.BOTTOM_BOUND:
-            e, bo = bo, e
+        if not wizard.carried_elements and wizard.touching_elements:
+            wizard.carry_element(wizard.touching_elements[0])
+
+    @timing.timed('collision.cannon_loads')
+    def cannon_loads(self, cannon, element):
+        if cannon.bullets or self.is_consumed(element):
+            return
+        cannon.carry_element(element)
 
-        e = self.bodyobjects[e.body]
+    @timing.timed('collision.element_falls')
+    def element_falls(self, element, __bottom):
+        if self.is_consumed(element):
+            return
 
-        if e.activated:
+        if element.activated:
             self.gameover()
 
-        self.remove_obj(e)
-        self.elements_in_zone.remove(e)
+        self.remove_obj(element)
+        self.elements_in_zone.remove(element)
 
-    def element_vs_element(self, __space, arbiter):
-        e1, e2 = [self.bodyobjects[s.body] for s in arbiter.shapes]
+    @timing.timed('collision.elements_meet')
+    def elements_meet(self, e1, e2):
+        if self.is_consumed(e1) or self.is_consumed(e2):
+            return
 
-        # Clock.schedule_once(partial(e1.collide_with_another,e2))
         retpoints = e1.collide_with_another(e2)
 
         if retpoints:
             x, y = e1.center
 
-            self.add_widget(PointsBaloon((x, y + 30), retpoints))
+            self.effects.points((x, y + 30), retpoints)
 
             self.points += retpoints
 
-        return True
-
-    def wizard_vs_bottom(self, __space, arbiter):
-        wiz, bo = arbiter.shapes
-        if wiz.collision_type == defs.BOTTOM_BOUND:
-            wiz, bo = bo, wiz
-
+    @timing.timed('collision.wizard_falls')
+    def wizard_falls(self, __wizard, __bottom):
         self.gameover()
 
     def on_key_up(self, __window, key, *__largs, **__kwargs):
         code = Keyboard.keycode_to_string(None, key)
-        self.keys_pressed.remove(code)
+        self.push_input('key_up', code)
+
+    def push_input(self, action, value=None):
+        """ player's input, done at next physics step """
+        self.inputs.append((action, value))
+
+    def apply_inputs(self):
+        """ inputs of this physics step, from player or from replayed recording """
+        if self.replay is not None:
+            actions = self.replay.actions(self.step_no)
+            self.inputs = []
+        else:
+            actions, self.inputs = self.inputs, []
+
+        for action, value in actions:
+            self.recording.add(self.step_no, action, value)
+            if action == 'move':
+                self.move_wizard(value)
+            elif action == 'aim':
+                self.aim_cannon(value)
+            elif action == 'shoot':
+                self.shoot(drop=value)
+            elif action == 'drop':
+                self.drop_carried_element()
+            elif action == 'key_down':
+                self.keys_pressed.add(value)
+            elif action == 'key_up':
+                self.keys_pressed.discard(value)
+            elif action == 'keys_clear':
+                self.keys_pressed.clear()
+            else:
+                raise ValueError("unknown action %r" % action)
+
+    def move_wizard(self, dx):
+        self.wizard.body.apply_impulse((defs.wizard_touch_impulse_x * dx, 0))
+
+    def aim_cannon(self, da):
+        self.cannon.aim += da
 
     def drop_carried_element(self):
         self.wizard.release_element()
@@ -245,7 +403,7 @@ class AlcanGame(ClockStopper, PhysicsObject):
     def shoot(self, drop=False):
         if self.cannon.shoot():
             self.skip_drop = True
-            Clock.schedule_once(lambda dt: setattr(self, 'skip_drop', False), defs.skip_drop_time)
+            self.schedule_once(lambda dt: setattr(self, 'skip_drop', False), self.world.difficulty.skip_drop_time)
         elif drop:
             self.wizard.release_element()
 
@@ -254,10 +412,13 @@ class AlcanGame(ClockStopper, PhysicsObject):
         # very dirty hack, but: we don't have any instance of keyboard anywhere, and
         # keycode_to_string should be in fact classmethod, so passing None as self is safe
         code = Keyboard.keycode_to_string(None, key)
-        self.keys_pressed.add(code)
+        self.push_input('key_down', code)
 
         if code == 'spacebar':
-            self.shoot(drop=True)
+            self.push_input('shoot', True)
+        elif code == 'f12':
+            timing.dump()
+            assets.log_stats()
 
     def on_touch_down(self, touch):
         touch.push()
@@ -281,7 +442,6 @@ class AlcanGame(ClockStopper, PhysicsObject):
         cdx, cdy = touch.x - self.current_touch.x, touch.y - self.current_touch.y
         Logger.debug("cdx, cdy = %s, %s", cdx, cdy)
         dx, dy = touch.dx, touch.dy
-        ix = defs.wizard_touch_impulse_x
 
         # check if we didn't start some action in UI. Eg when user started to move wizard, it's unconvenient for him to 
         # aim in the same time, so we need minimum time until we allow him to do different thing
@@ -291,14 +451,14 @@ class AlcanGame(ClockStopper, PhysicsObject):
 
 
         if self.touch_phase == 'sweep':
-            self.wizard.body.apply_impulse((ix * dx, 0))
+            self.push_input('move', dx)
         elif self.touch_phase == 'aim':
-            self.cannon.aim += dy / 2
+            self.push_input('aim', dy / 2)
 
         return False
 
     def on_touch_up(self, touch):
-        self.keys_pressed.clear()
+        self.push_input('keys_clear')
         self.touch_phase = None
         self.current_touch = None
         Logger.debug("on_touch_up ... touch_phase=None")
@@ -316,36 +476,78 @@ class AlcanGame(ClockStopper, PhysicsObject):
 
         self.scale = min(xratio, yratio)
 
+    @timing.timed('update')
     def update(self, dt):
-        self.update_space()
-
-        mi, ma = defs.num_elements_in_zone
+        """ frame: as many physics steps as the time which passed needs, then redraw """
+        world = self.world
+        for __ in range(world.physics_steps(dt)):
+            self.physics_step()
+
+        world.update_to_bodies()
+        now = self.frame_time()
+        self.play_animations(now)
+
+        if self.element_batch:
+            with timing.span('update.batch'):
+                self.element_batch.update(self.elements_in_zone, world.entities)
+
+        with timing.span('update.effects'):
+            self.effects.update(now)
+
+    def physics_step(self):
+        """ input, game clock, physics and game logic of one step of 1/physics_rate """
+        step = 1.0 / defs.physics_rate
+        self.apply_inputs()
+        self.world.clock.tick(step)
+        self.world.step_space()
+        self.resolve_contacts()
+        self.update_logic(step)
+        self.step_no += 1
+
+    def frame_time(self):
+        """ game time of drawn frame, between physics steps """
+        return self.get_time() + self.world.accumulator
+
+    def play_animations(self, now):
+        """ next frame of objects playing animation, every drawn frame """
+        with timing.span('update.animate'):
+            for o in list(self.animated):
+                if not o.animate(now - o.animation_started):
+                    self.animated.discard(o)
+
+    def update_logic(self, dt):
+        """ game logic, done after each physics step """
+        difficulty = self.world.difficulty
+        mi, ma = difficulty.num_elements_in_zone
         n = sum(int(not e.activated) for e in self.elements_in_zone)
 
         if n < mi:
             self.drop_element()
 
-        if random.random() < defs.drop_chance and n < ma:
+        if self.world.rng.random() < difficulty.drop_chance and n < ma:
             self.drop_element()
 
-        for o in self.children:
-            if isinstance(o, AnimObject):
-                o.update(dt)
+        with timing.span('update.objects'):
+            for o in self.children:
+                if isinstance(o, AnimObject):
+                    o.update(dt)
 
-        for o in self.oo_to.remove:
-            self.remove_obj(o, just_schedule=False)
-            assert o not in self.children
-        self.oo_to.remove.clear()
+        with timing.span('update.flush'):
+            for o in self.oo_to.remove:
+                self.remove_obj(o, just_schedule=False)
+                assert o not in self.children
+            self.oo_to.remove.clear()
+            self.forget_removed()
 
-        for ocl, oa, okw in self.oo_to.add:
-            newo = ocl(*oa, **okw)
-            self.add_widget(newo)
-        self.oo_to.add[:] = []
+            for ocl, oa, okw in self.oo_to.add:
+                newo = ocl.acquire(self.world, *oa, **okw)
+                self.add_widget(newo)
+            self.oo_to.add[:] = []
 
         if 'up' in self.keys_pressed:
-            self.cannon.aim += 3
+            self.aim_cannon(3)
         if 'down' in self.keys_pressed:
-            self.cannon.aim -= 3
+            self.aim_cannon(-3)
 
         dx = 0
         if 'left' in self.keys_pressed:
@@ -353,20 +555,22 @@ class AlcanGame(ClockStopper, PhysicsObject):
         if 'right' in self.keys_pressed:
             dx += 20
         if dx:
-            self.wizard.body.apply_impulse((defs.wizard_touch_impulse_x * dx, 0))
+            self.move_wizard(dx)
 
         self.update_beam_pos(dt)
 
     def update_beam_pos(self, dt):
 
         beam_dx = 10
-        beam_move_dt = 60 * beam_dx / defs.beam_speed
+        beam_move_dt = 60 * beam_dx / self.world.difficulty.beam_speed
         
-        if (time.time() - self.left_beam_time) > beam_move_dt:
+        if (self.get_time() - self.left_beam_time) > beam_move_dt:
             px, py = self.left_beam.body.position
             self.left_beam.body.position = (px + beam_dx, py)
-            self.left_beam_time = time.time()
+            self.left_beam.body.activate()  # moved by hand, wake it and things lying on it
+            self.left_beam_time = self.get_time()
 
+    @timing.timed('update.drop')
     def drop_element(self):
         """ 
             drop element from heaven 
@@ -377,21 +581,25 @@ class AlcanGame(ClockStopper, PhysicsObject):
         if self.skip_drop:
             return
 
-        _w, h = self.size
+        __w, h = defs.map_size  # top of map, size of widget depends on window
 
         # get proper x coordinate
-        x = random.randint(*defs.drop_zone)
+        x = self.world.rng.randint(*self.world.difficulty.drop_zone)
 
-        element = Element.random(elizo=self.elements_in_zone)
+        element = Element.random(self.world, self.elements_in_zone)
         if not element:
             return
         element.center = (x, h)
         self.add_widget(element)
 
     def reached_elname(self, elname):
+        if self.planner.discover(elname):
+            self.bfs = self.planner.remaining
+
         if elname == "dragon":
             Logger.debug("reached DRAGON!!!!!")
-            wi = Success(center=self.center, size=(700, 400))
+            wi = Success(center=self.center, size=(700, 400), points=self.points)
+            self.bind(points=wi.setter('points'))
             self.add_widget(wi)
             self.game_is_over = True
-            App.get_running_app().sm.schedule_gameover()
+            self.schedule_gameover()
@@ -1,61 +1,31 @@
-from math import degrees
-
-from cymunk import Body, Circle, Space, Segment, Vec2d
-from kivy.clock import Clock
+from cymunk import Body, Circle
+from kivy.graphics import Rectangle
 from kivy.logger import Logger
 from kivy.properties import NumericProperty
 from kivy.uix.widget import Widget
 
+from assets import sprite
 import defs
 
 
 class PhysicsObject(object):
-    """ super object, which holds physics in class attributes """
-
-    space = None
-    bodyobjects = {}
+    """ super object of objects with body, physics is in their world """
 
     mass = NumericProperty(10, allownone=True)
     moment_of_inertia = NumericProperty('INF', allownone=True)
     friction = NumericProperty(defs.friction)
 
-    def __init__(self):
-        if self.space is None:
-            self.init_physics()
-
-    @staticmethod
-    def init_physics():
-        """ instead of using space as global variable """
-        cls = PhysicsObject
-        cls.space = Space()
-        cls.space.gravity = defs.gravity
-
-        ra = 100
-        w, h = defs.map_size
-
-        for x1, y1, x2, y2, ct in [
-                (-100, defs.floor_level - ra, w + 100, defs.floor_level - ra, defs.BOTTOM_BOUND),
-                (-ra, h + 100, -ra, -100, defs.LEFT_BOUND),
-                (w + ra, h + 100, w + ra, -100, defs.RIGHT_BOUND)
-              ]:
-            wall = Segment(cls.space.static_body, Vec2d(x1, y1), Vec2d(x2, y2), ra)
-            wall.elasticity = 0.6
-            wall.friction = defs.friction
-            wall.collision_type = ct
-            cls.space.add_static(wall)
-
-    @staticmethod
-    def del_physics():
-        cls = PhysicsObject
-        del(cls.space)
-        cls.space = None
+    @property
+    def space(self):
+        return self.world.space
 
-    @classmethod
-    def update_space(cls):
-        cls.space.step(1.0/20.0)
+    @property
+    def bodyobjects(self):
+        return self.world.bodyobjects
 
-        for __b, o in cls.bodyobjects.items():
-            o.update_to_body()
+    @property
+    def entities(self):
+        return self.world.entities
 
     def add_to_space(self, __body, space):
         space = self.space
@@ -66,100 +36,201 @@ class PhysicsObject(object):
         space.add(self.shape)
 
         self.bodyobjects[self.body] = self
+        self.static = self.mass is None  # not simulated, nobody moves it
+        self.slot = self.entities.add(self)
 
         self.on_body_init()
 
-    def update_to_body(self):
-        """
-            update widget position to body position
-        """
-        p = self.body.position
-        self.center = tuple(p)
+    def show(self, x, y, angle):
+        """ move widget to (interpolated) state of body, angle in degrees """
+        self.center = (x, y)
 
         if hasattr(self, 'angle'):
-            ang = degrees(self.body.angle)
-            self.angle = ang
+            self.angle = angle
 
     def on_body_init(self):
         """ called when body is finally set up """
         pass
 
+
+class FrameAnimation(object):
+    """
+        multi-frame animation, played from sprite sheet (texture atlas) by
+        batched effects or by AnimObject. Frames are regions of one texture,
+        so changing frame changes only texture coordinates. Frame is chosen by
+        time since start, not by number of updates, and size is interpolated
+        from sizes[0] to sizes[1] pixels.
+    """
+
+    def __init__(self, names, duration, sizes):
+        self.names = names
+        self.duration = duration
+        self.sizes = sizes
+        self.textures = None  # loaded when played first time
+
+    def frame(self, t):
+        """ (texture, size) of frame t seconds after start, None when it's over """
+        if t >= self.duration:
+            return None
+        if self.textures is None:
+            self.textures = [sprite(name) for name in self.names]
+
+        progress = t / self.duration
+        start, end = self.sizes
+        return self.textures[int(progress * len(self.textures))], start + (end - start) * progress
+
+
 class ClockStopper(Widget):
-    """ class which holds all scheduled clocks and allows to stop them all
-        useful if it's eg. game over """
+    """ object of game world, which schedules events on world's clock, so
+        that they can be stopped all at once, eg. when game is over.
 
-    clocks = []
-    
-    def __init__(self, *args, **kwargs):
+        Events which concern the object, also those other objects schedule
+        for it, are scheduled by its schedule_once(), so that they are
+        cancelled when it is removed from game and recycled """
+
+    world = None  # World, given when object is created or added to game
+
+    def __init__(self, *args, world=None, **kwargs):
         self.on_init_called = False
+        self.events = []  # scheduled for object, see cancel_events
+        if world is not None:
+            self.world = world
         super(ClockStopper, self).__init__(*args, **kwargs)
-        self.wait_for_parent()
-
-    def wait_for_parent(self, dt=None):
-        if self.parent and not self.on_init_called:
-            # finally
-            self.on_init()
-            self.on_init_called = True
-            return
 
-        self.schedule_once(self.wait_for_parent)
+    def attach(self):
+        """ object has parent and all its properties set, initialize it (once).
+            Return True if it was done now """
+        if self.on_init_called:
+            return False
+        self.on_init_called = True
+        self.on_init()
+        return True
 
     def on_init(self):
         pass
 
-    @classmethod
-    def schedule_once(cls, *args, **kwargs):
-        cls.clocks.append(Clock.schedule_once(*args, **kwargs))
-        cls.clocks_cleanup()
+    def schedule_once(self, *args, **kwargs):
+        return self.add_event(self.world.schedule_once(*args, **kwargs))
 
-    @classmethod
-    def schedule_interval(cls, *args, **kwargs):
-        cls.clocks.append(Clock.schedule_interval(*args, **kwargs))
-        cls.clocks_cleanup()
+    def schedule_interval(self, *args, **kwargs):
+        return self.add_event(self.world.schedule_interval(*args, **kwargs))
 
-    @classmethod
-    def stop_all_clocks(cls):
-        for event in cls.clocks:
-            event.cancel()
-        cls.clocks_cleanup()
+    def add_event(self, ev):
+        self.events = [e for e in self.events if e.is_triggered]
+        self.events.append(ev)
+        return ev
 
-    @classmethod
-    def clocks_cleanup(cls):
-        for ev in cls.clocks[:]:
-            if not ev.is_triggered:
-                cls.clocks.remove(ev)
+    def cancel_events(self):
+        """ cancel events which were scheduled for object and didn't happen yet """
+        for ev in self.events:
+            ev.cancel()
+        self.events = []
+
+    def get_time(self):
+        """ game time, in seconds """
+        return self.world.get_time()
 
 
 class AnimObject(ClockStopper, PhysicsObject):
     """ base object for all animated objects in game """
 
     collision_type = NumericProperty(0)
+    pooled = False  # removed objects are recycled, see pool.py
+    acquired = False  # taken from pool, and not released yet
+    physical = True  # has body in space, false for pure visual effects
+    batched = False  # drawn by game's ElementBatch, see entities.py
+    animation = None  # played by animate(), see play
+    frame_rect = None  # shows frames of FrameAnimation, made when object plays one first time
 
     def __init__(self, *args, **kwargs):
         super(AnimObject, self).__init__(*args, **kwargs)
 
         self.body = None
+        self.shape = None
         self.layers = None
-        self.add_body()
 
-    def add_body(self, dt=None):
+    @classmethod
+    def acquire(cls, world, *args, **kwargs):
+        """ new object in world, from its pool if class is pooled """
+        if not cls.pooled:
+            return cls(*args, world=world, **kwargs)
+        return world.pools.pool(cls).acquire(*args, **kwargs)
+
+    def release(self):
+        """ object was removed from game, return it to pool """
+        self.cancel_events()
+        self.hide_frame()
+        if self.pooled:
+            self.world.pools.pool(type(self)).release(self)
+
+    def recycle(self, **kwargs):
+        """ make released object new again, as if it was created with kwargs """
+        if 'size' in kwargs:  # first, center is set for new size
+            self.size = kwargs.pop('size')
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+        self.on_init_called = False
 
-        if not self.parent:  # object not initialized yet
-            # call myself in next frame,
-            self.schedule_once(self.add_body)
-            return
+    def on_release(self):
+        """ called when object is returned to pool, let go what it holds """
+        pass
 
+    def attach(self):
+        """ called by game when object is added to it, creates body """
+        if super(AnimObject, self).attach() and self.physical:
+            self.add_body()
+
+    def play(self, animation):
+        """ start playing animation, game calls animate() every drawn frame until it's over """
+        self.animation = animation
+        self.animation_started = self.get_time()
+        self.parent.animated.add(self)
+        self.animate(0)
+
+    def animate(self, t):
+        """ show state of animation t seconds after it started, return False when it's over.
+            Frames of FrameAnimation are shown centered on object, above it """
+        frame = self.animation.frame(t) if isinstance(self.animation, FrameAnimation) else None
+        if frame is None:
+            self.hide_frame()
+            return False
+
+        texture, size = frame
+        if self.frame_rect is None:
+            self.frame_rect = Rectangle()
+            self.canvas.after.add(self.frame_rect)
+        x, y = self.center
+        self.frame_rect.texture = texture
+        self.frame_rect.pos = (x - size / 2, y - size / 2)
+        self.frame_rect.size = (size, size)
+        return True
+
+    def hide_frame(self):
+        if self.frame_rect is not None:
+            self.canvas.after.remove(self.frame_rect)
+            self.frame_rect = None
+
+    def add_body(self):
+        """ create body and shape, and add them to space """
         if self.mass is None:
             self.moment_of_inertia is None
 
-        self.body = Body(self.mass, self.moment_of_inertia)
+        if self.body is None:
+            self.body = Body(self.mass, self.moment_of_inertia)
+        else:  # recycled
+            self.body.velocity = (0, 0)
+            self.body.angular_velocity = 0
+            self.body.angle = 0
+            self.body.reset_forces()
         self.body.position = self.center
 
-        self.shape = self.create_shape()
+        if self.shape is None or self.shape_size != tuple(self.size):
+            self.shape = self.create_shape()
+            self.shape_size = tuple(self.size)
+        elif self.layers:
+            self.shape.layers = self.layers
 
         self.add_to_space(self.body, self.shape)
-        self.body
-        self.shape
 
     def create_shape(self):
         sx, sy = self.size
@@ -187,7 +258,7 @@ class AnimObject(ClockStopper, PhysicsObject):
         
         if self.parent:  # if not have parent, then maybe it doesn't need baloon?
             self.parent.add_widget(
-                Baloon(self, (px, py), text, **kwargs)
+                Baloon.acquire(self.world, self, (px, py), text, **kwargs)
             )
 
     def update(self, dt):
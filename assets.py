@@ -0,0 +1,158 @@
+"""
+    sprite textures and sounds, loaded before game needs them
+
+    Preloader decodes images and sounds in background thread while intro
+    screen is shown, and uploads images to GPU in main thread, a few per
+    frame. Sprites packed in the atlas are regions of its pages, also for
+    atlas:// sources, which use kivy's atlas made of preloaded pages. Game
+    takes textures from cache by sprite name with sprite(); sprites which
+    were not preloaded are loaded synchronously, and counted as misses.
+    Counters are logged when game is created, at game over, with F12 and
+    when game is cleared.
+"""
+
+from collections import deque
+import os
+from threading import Thread
+
+from kivy.atlas import Atlas
+from kivy.cache import Cache
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage, ImageLoader
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import NumericProperty
+
+from elmap import load_elmap
+import snd
+from utils import ATLAS, atlas_pages, imgsrc
+
+# sprites which are not elements
+FIXED_SPRITES = ('beam', 'cannon', 'wizard', 'rplatform', 'hint', 'plus', 'equal',
+                 'button-shoot', 'button-drop') + tuple("explosion%02d" % i for i in range(1, 6))
+
+textures = {}  # sprite name -> texture
+counters = {'hit': 0, 'miss': 0}
+
+
+class PreloadedAtlas(Atlas):
+    """ kivy's atlas of sprites, made of pages uploaded by Preloader instead
+        of loading them again when atlas:// source is used first time """
+
+    def __init__(self, regions):
+        self.regions = regions
+        super(PreloadedAtlas, self).__init__(ATLAS)
+
+    def _load(self):
+        self.textures = self.regions
+
+
+def add_page(texture, regions):
+    """ cache sprites of atlas page, they are regions of one texture """
+    for name, (x, y, w, h) in regions.items():
+        textures[name] = texture.get_region(x, y, w, h)
+
+
+def warm_atlas():
+    """ let atlas:// sources use cached regions, once all pages of atlas are cached """
+    key = os.path.splitext(ATLAS)[0]
+    if Cache.get('kv.atlas', key) is not None:
+        return  # kivy loaded it already, for source which was used before
+
+    names = [name for regions in atlas_pages().values() for name in regions]
+    if all(name in textures for name in names):
+        Cache.append('kv.atlas', key, PreloadedAtlas({name: textures[name] for name in names}))
+
+
+def sprite(name):
+    """ texture of sprite name (element name, or one of FIXED_SPRITES) """
+    if not name:
+        return None
+    try:
+        ret = textures[name]
+        counters['hit'] += 1
+        return ret
+    except KeyError:
+        counters['miss'] += 1
+
+    Logger.debug("assets: %s was not preloaded", name)
+    textures[name] = CoreImage(imgsrc(name)).texture
+    return textures[name]
+
+
+def log_stats():
+    Logger.info("assets: %s textures cached, %s hits, %s misses",
+                len(textures), counters['hit'], counters['miss'])
+
+
+class Preloader(EventDispatcher):
+    """ warms texture cache and loads sounds in background """
+
+    progress = NumericProperty(0)  # 0.0 ... 1.0
+    per_frame = 4  # number of textures uploaded to GPU in one frame
+
+    def __init__(self, names=None, **kwargs):
+        super(Preloader, self).__init__(**kwargs)
+
+        if names is None:
+            names = FIXED_SPRITES + tuple(load_elmap().names)
+
+        # images to decode: (image file, {sprite name: region or None for whole image})
+        self.jobs = []
+        rest = set(names) - set(textures)
+        for fname, regions in atlas_pages().items():
+            if rest & set(regions):
+                self.jobs.append((fname, regions))
+                rest -= set(regions)
+        for name in sorted(rest):
+            self.jobs.append(("img/" + name + ".png", {name: None}))
+
+        self.decoded = deque()  # (job, image) from decoding thread, (None, sounds) at the end
+        self.total = len(self.jobs) + 1  # and sounds
+        self.done = 0
+
+    def start(self):
+        Thread(target=self.decode, name="preloader", daemon=True).start()
+        Clock.schedule_interval(self.upload, 0)
+
+    def decode(self):
+        """ in thread: read and decode images and sounds, without touching GL """
+        for job in self.jobs:
+            fname, __regions = job
+            try:
+                image = ImageLoader.load(fname, keep_data=True, nocache=True)
+            except Exception as e:
+                Logger.warning("assets: cannot load %s (%s)", fname, e)
+                image = None
+            self.decoded.append((job, image))
+
+        try:
+            sounds = snd.decode_sounds()
+        except Exception as e:
+            Logger.warning("assets: cannot load sounds (%s)", e)
+            sounds = {}
+        self.decoded.append((None, sounds))
+
+    def upload(self, __dt):
+        """ in main thread: make textures of decoded images, and hand over sounds """
+        for __ in range(self.per_frame):
+            if not self.decoded:
+                break
+            job, result = self.decoded.popleft()
+            self.done += 1
+            if job is None:
+                snd.load_sounds(result)
+                continue
+            if result is None:
+                continue
+            fname, regions = job
+            if fname in atlas_pages():
+                add_page(result.texture, regions)
+                warm_atlas()
+            else:
+                textures.update(dict.fromkeys(regions, result.texture))
+
+        self.progress = self.done / self.total
+        if self.done == self.total:
+            Logger.info("assets: %s textures preloaded", len(textures))
+            return False
@@ -1,67 +1,85 @@
-from cymunk import DampedSpring
-from kivy.clock import Clock
+from math import hypot
+
 from kivy.properties import ListProperty, StringProperty
 
 from anim import AnimObject
 import defs
 
 
+class Float(object):
+    """
+        motion of baloon: lifted by constant force, optionally held by damped
+        spring to anchor. Not part of physics space, integrated once per drawn
+        frame, so it costs the same however crowded the space is
+    """
+
+    max_dt = 0.1
+
+    def __init__(self, pos, mass, force, spring=None):
+        self.x, self.y = pos
+        self.vx = self.vy = 0.0
+        self.mass = mass
+        gx, gy = defs.gravity
+        fx, fy = force
+        self.ax = fx / mass + gx
+        self.ay = fy / mass + gy
+        self.spring = spring  # (rest length, stiffness, damping), like cymunk's DampedSpring
+        self.t = 0.0
+
+    def advance(self, t, anchor=None):
+        """ position at time t, from the one at previous call """
+        dt = min(t - self.t, self.max_dt)
+        self.t = t
+        if dt <= 0:
+            return self.x, self.y
+
+        ax, ay = self.ax, self.ay
+        if self.spring and anchor is not None:
+            rest, stiffness, damping = self.spring
+            dx, dy = self.x - anchor[0], self.y - anchor[1]
+            dist = hypot(dx, dy) or 1.0
+            nx, ny = dx / dist, dy / dist
+            f = (rest - dist) * stiffness - damping * (self.vx * nx + self.vy * ny)
+            ax += f * nx / self.mass
+            ay += f * ny / self.mass
+
+        self.vx += ax * dt
+        self.vy += ay * dt
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        return self.x, self.y
+
+
 class Baloon(AnimObject):
 
     anchor = ListProperty([0, 0])
     text = StringProperty("...")
+    pooled = True
+    physical = False
+    spring = (130, 1.9, 1.5)
 
-    def __init__(self, object_to_follow, center, text, size=(100, 50)):
-        super(Baloon, self).__init__(center=center, size=size)
+    def __init__(self, object_to_follow, center, text, size=(100, 50), world=None):
+        super(Baloon, self).__init__(center=center, size=size, world=world)
+        self.init_state(object_to_follow, text)
 
+    def init_state(self, object_to_follow, text):
         self.object_to_follow = object_to_follow
         self.anchor = self.object_to_follow.center
-        self.layers = defs.VISUAL_EFFECTS_LAYER
         self.text = text
 
         self.schedule_once(self.remove, 5)
 
-    def add_body(self, dt=None):
-        super(Baloon, self).add_body(dt=dt)
-        if self.body:  # if obj is initialized yet
-            gx, gy = defs.gravity
-            self.body.apply_force(defs.baloon_force)
+    def recycle(self, object_to_follow, center, text, size=(100, 50)):
+        self.init_state(object_to_follow, text)
+        super(Baloon, self).recycle(center=center, size=size)
 
-            self.joint = DampedSpring(self.body, self.object_to_follow.body,
-                                      tuple(self.pos),
-                                      tuple(self.object_to_follow.center),
-                                      130, 1.9, 1.5)
-            self.space.add(self.joint)
+    def on_init(self):
+        self.play(Float(self.center, self.mass, defs.baloon_force, self.spring))
 
-    def update(self, dt):
+    def animate(self, t):
         self.anchor = self.object_to_follow.center
-
-    def remove(self, dt=None):
-        """ remove existing joint """
-        if not self.joint:
-            return
-        joint = self.joint
-        self.joint = None
-        self.space.remove(joint)
-        del(joint)
-
-        self.parent.remove_obj(self)
-
-class PointsBaloon(AnimObject):
-    def __init__(self, center, points):
-        super().__init__(center=center)
-
-        self.points = points
-
-        self.layers = defs.VISUAL_EFFECTS_LAYER
-        self.schedule_once(self.remove, 5)
-
-
-    def add_body(self, dt=None):
-        super().add_body()
-        if self.body:
-            self.body.apply_force(defs.baloon_force)
+        self.center = self.animation.advance(t, self.anchor)
+        return True
 
     def remove(self, dt=None):
         self.parent.remove_obj(self)
-    
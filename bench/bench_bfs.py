@@ -0,0 +1,82 @@
+"""
+    micro-benchmark of recipe solver (bfs.Solver) against previous
+    exponential recursion, on random recipe books of growing size
+
+    usage: python bench/bench_bfs.py [size ...]
+"""
+
+from os.path import abspath, dirname
+import random
+import sys
+import timeit
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from bfs import Solver, reverse_elmap  # noqa: E402
+
+BASE = ('water', 'fire', 'air', 'earth')
+
+
+def naive_bfs(known, end, pamle):
+    """ previous implementation of bfs.bfs, kept as reference """
+    variants = pamle[end]
+    if not variants:
+        return []
+
+    retcands = []
+    for a, b in variants:
+        retcand = [(a, b)]
+
+        if a not in known or b not in known:
+            for e in (a, b):
+                steps = naive_bfs(known.copy(), e, pamle)
+                retcand = steps + retcand
+
+        retcands.append(retcand)
+
+    retcands.sort(key=lambda x: len(x))
+
+    return retcands[0]
+
+
+def random_elmap(size, variants=2, seed=0):
+    """ recipe book with size elements, each invented element has up to
+        `variants` combinations of elements invented before it """
+    rnd = random.Random(seed)
+    names = list(BASE) + ['e%d' % i for i in range(size - len(BASE))]
+    elmap = {}
+    for i, c in enumerate(names[len(BASE):], len(BASE)):
+        nvariants = rnd.randint(1, variants)
+        while nvariants:
+            # prefer recent elements, so recipe depth grows with size
+            key = tuple(sorted(names[max(0, i - 1 - int(rnd.expovariate(0.3)))] for __ in range(2)))
+            if key not in elmap:
+                elmap[key] = c
+                nvariants -= 1
+    return elmap, names[-1]
+
+
+def bench(size, number=20, naive_limit=30):
+    elmap, end = random_elmap(size)
+    known = set(BASE)
+
+    def fresh():
+        # include building of reverse map, and don't profit from memoization
+        return Solver(elmap).steps(known, end)
+
+    t_new = timeit.timeit(fresh, number=number) / number
+    t_naive = None
+    if size <= naive_limit:
+        pamle = reverse_elmap(elmap)
+        t_naive = timeit.timeit(lambda: naive_bfs(set(known), end, pamle), number=number) / number
+
+    print("%5d elements  solver %8.3f ms  naive %s  steps=%s" % (
+        size, t_new * 1000,
+        "%8.3f ms" % (t_naive * 1000) if t_naive is not None else "     (skipped)",
+        len(fresh())))
+
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 20, 30, 40, 100, 200, 500, 1000]
+    for s in sizes:
+        bench(s)
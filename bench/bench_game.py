@@ -0,0 +1,199 @@
+"""
+    benchmark of game loop in reproducible scenarios, run headless
+
+    Each scenario appends one JSON line to results file, with commit, frame
+    time of AlcanGame.update(), physics step, solver spans and allocation
+    counters, so regressions can be compared commit by commit.
+
+    With -m, memory allocated in each frame is traced with tracemalloc: peak
+    of memory above the one at start of frame, which counts also objects
+    allocated and freed within frame. Tracing slows the game down, so steps/s
+    and spans of such run are not comparable with those without it.
+
+    With -s, every scenario runs shortly and nothing is written, as a smoke
+    check that game objects can be created, recycled and shown in logs.
+
+    usage: python bench/bench_game.py [-o results.jsonl] [-n steps] [-m] [-s] [scenario ...]
+"""
+
+import argparse
+import gc
+import json
+from os.path import abspath, dirname
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # game loads data/, img/ and alcan.kv relatively
+os.environ.setdefault('TIMING', 'bench-timing.json')  # timing has to be enabled before game is imported
+
+# first of game modules: kivy has to be configured headless before anything imports it
+from headless import Bot, Simulation  # noqa: E402
+import assets  # noqa: E402
+from baloon import Baloon  # noqa: E402
+from element import Element  # noqa: E402
+import timing  # noqa: E402
+
+SPANS = ('update', 'physics.step', 'physics.refresh', 'physics.sync', 'update.effects', 'solver.discover', 'solver.pop_hint', 'solver.random')
+
+
+def resting(sim, n):
+    """ n elements dropped to the zone, nobody touches them """
+    sim.game.world.difficulty.num_elements_in_zone = (n, n)
+    return None
+
+
+def cannon_stream(sim):
+    """ element appears in the cannon and is shot every 10 frames,
+        green elements merge or explode in the collider """
+    sim.game.world.difficulty.explode_when_nocomb = 1.0
+    bot = Bot(sim.game.world.seed)
+    names = sorted(sim.game.world.discovery.available_elnames)
+
+    def script(sim):
+        game = sim.game
+        if game.cannon.bullets:
+            return [('aim', bot.aim_range[0] - game.cannon.aim), ('shoot', None)]
+        if sim.steps % 10 == 0:
+            game.add_widget(Element.acquire(game.world, random.choice(names), center=game.cannon.center))
+        return []
+    return script
+
+
+def baloons(sim):
+    """ crowd of baloons, like when many new elements appear at once """
+    def script(sim):
+        game = sim.game
+        if sim.steps % 50 == 0:
+            for i in range(10):
+                game.add_widget(Baloon.acquire(game.world, game.wizard, (100 + 80 * i, 400), "baloon %s" % i))
+        return []
+    return script
+
+
+def full_game(sim):
+    """ bot plays whole game """
+    return Bot(sim.game.world.seed)
+
+
+SCENARIOS = {
+    'resting-8': ('medium', lambda sim: resting(sim, 8)),
+    'resting-40': ('medium', lambda sim: resting(sim, 40)),
+    'cannon-stream': ('easy', cannon_stream),
+    'baloons': ('medium', baloons),
+    'game-easy': ('easy', full_game),
+    'game-medium': ('medium', full_game),
+    'game-hard': ('hard', full_game),
+}
+
+
+def run_scenario(name, steps, seed=0, memory=False):
+    level, setup = SCENARIOS[name]
+    random.seed(seed)
+
+    sim = Simulation(level, seed=seed)
+    script = setup(sim)
+    timing.reset()
+
+    peaks = []  # bytes allocated in frame, above memory at its start
+    if memory:
+        tracemalloc.start()
+    gc_before = gc.get_stats()[0]['collections']
+    started = time.perf_counter()
+    for __ in range(steps):
+        if sim.is_over:
+            break
+        if memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        sim.step(script(sim) if script else ())
+        if memory:
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    elapsed = time.perf_counter() - started
+    gc_collections = gc.get_stats()[0]['collections'] - gc_before
+    if memory:
+        tracemalloc.stop()
+
+    frames = max(sim.steps, 1)
+    result = {
+        'scenario': name,
+        'level': level,
+        'steps': sim.steps,
+        'game_over': sim.is_over,
+        'points': sim.game.points,
+        'elements': len(sim.game.elements_in_zone),
+        'steps_per_s': sim.steps / elapsed,
+        'traced': memory,
+        # peak of memory allocated in frame (with -m), and young gc generation
+        # collections (one per ~700 new container objects), measure allocation churn
+        'alloc_peak_kb_per_frame': sum(peaks) / frames / 1024 if memory else None,
+        'gc0_per_1000_frames': gc_collections * 1000.0 / frames,
+        'spans': {s['span']: s for s in timing.stats() if s['span'] in SPANS},
+        'pools': sim.game.world.pools.stats(),
+        'textures': dict(assets.counters),
+    }
+
+    sim.close()
+    return result
+
+
+def smoke(steps=100):
+    """ scenarios run without errors, element is created directly and recycled from pool """
+    for name in sorted(SCENARIOS):
+        run_scenario(name, steps)
+
+    sim = Simulation('easy', seed=0)
+    game = sim.game
+    names = sorted(game.world.discovery.available_elnames)
+    element = Element(names[0], world=game.world, center=(500, 400))
+    game.add_widget(element)
+    sim.step()
+    game.remove_obj(element)  # removed after next step
+    sim.step()
+    recycled = Element.acquire(game.world, names[-1], center=(500, 400))
+    assert recycled is element and recycled.elname == names[-1], "%r was not recycled" % recycled
+    sim.close()
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', default=sorted(SCENARIOS))
+    parser.add_argument('-n', '--steps', type=int, default=3000)
+    parser.add_argument('-o', '--output', default='bench-results.jsonl')
+    parser.add_argument('-m', '--memory', action='store_true', help="trace memory allocated in frames")
+    parser.add_argument('-s', '--smoke', action='store_true', help="run scenarios shortly, write no results")
+    args = parser.parse_args()
+
+    if args.smoke:
+        smoke()
+        print("smoke: ok")
+        sys.exit(0)
+
+    rev = commit()
+    with open(args.output, 'a') as f:
+        for name in args.scenarios:
+            result = run_scenario(name, args.steps, memory=args.memory)
+            result['commit'] = rev
+            result['time'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+
+            update = result['spans'].get('update', {})
+            alloc = result['alloc_peak_kb_per_frame']
+            print("%-14s %6d steps %8.0f steps/s  update p50 %.3f p95 %.3f p99 %.3f ms  %s  %.1f gc0/1000 frames" % (
+                name, result['steps'], result['steps_per_s'],
+                update.get('p50', 0), update.get('p95', 0), update.get('p99', 0),
+                "%.1f kB alloc/frame" % alloc if alloc is not None else "", result['gc0_per_1000_frames']))
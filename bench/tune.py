@@ -0,0 +1,198 @@
+"""
+    difficulty tuning - bot plays many headless games for each setting of a
+    grid of difficulty parameters, in a process per core
+
+    Each setting appends one JSON line to results file as soon as its games
+    are done: rate of reaching dragon and of game over, game time to dragon,
+    steps per step of initial plan to dragon (bfs), points and frame cost.
+
+    Game ends at dragon, game over, after -n steps, or when bot made no
+    step of plan to dragon for -t seconds of game time (stalled), so games
+    which go nowhere don't take the whole budget. Progress line of each
+    setting shows physics steps per second of a worker, and estimated time
+    of the rest of grid.
+
+    usage: python bench/tune.py [-l medium] [-g games] [-n steps] [-t stall] [-j processes]
+                                [-o results.jsonl] [-p name=value,value ...] ...
+
+    eg.  python bench/tune.py -p beam_speed=10,20,40 -p drop_useless_chance=0,0.3
+"""
+
+import argparse
+import ast
+from collections import defaultdict
+import itertools
+import json
+from os.path import abspath, dirname
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+# workers' kivy logs would be interleaved with results
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+# SDL's own SIGTERM handler in workers keeps them alive when pool terminates them
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+
+def parse_param(text):
+    """ 'name=v1,v2' -> (name, [v1, v2]), values are python literals """
+    name, __, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError("expected name=value,value..., got %r" % text)
+    return name.strip(), ast.literal_eval('[%s]' % values)
+
+
+def grid(params):
+    """ list of settings (dicts), one for each combination of values """
+    names = [name for name, __ in params]
+    return [dict(zip(names, values)) for values in itertools.product(*(v for __, v in params))]
+
+
+def init_worker():
+    """ in worker process: headless kivy and the game, once """
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # game loads data/, img/ and kv files relatively
+    import headless  # noqa: F401
+
+
+def play(task):
+    """ in worker process: one game of bot, return its result """
+    from headless import Bot, Simulation
+    import defs
+
+    index, level, setting, seed, steps, stall = task
+
+    sim = Simulation(level, seed=seed, difficulty=setting)
+    game = sim.game
+    bot = Bot(seed)
+    bfs_start = game.bfs
+    stall_steps = int(stall * defs.physics_rate)
+
+    frames = []
+    bfs, progressed = game.bfs, 0  # step of last progress of plan
+    stalled = False
+    started = time.perf_counter()
+    for step in range(steps):
+        if sim.is_over:
+            break
+        if game.bfs != bfs:
+            bfs, progressed = game.bfs, step
+        elif step - progressed > stall_steps:
+            stalled = True
+            break
+        t = time.perf_counter()
+        sim.step(bot(sim))
+        frames.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+
+    dragon = 'dragon' in game.world.discovery.available_elnames
+    result = {
+        'index': index,
+        'seed': seed,
+        'steps': sim.steps,
+        'game_time': sim.steps / defs.physics_rate,
+        'dragon': dragon,
+        'game_over': sim.is_over and not dragon,
+        'stalled': stalled,
+        'points': game.points,
+        'bfs_start': bfs_start,
+        'bfs_end': game.bfs,
+        'frame_mean': elapsed / max(len(frames), 1) * 1000,
+        'frame_max': max(frames) * 1000 if frames else 0.0,
+        'elapsed': elapsed,
+    }
+    sim.close()
+    return result
+
+
+def percentiles(values, ps=(0.1, 0.5, 0.9)):
+    values = sorted(values)
+    n = len(values)
+    return {'p%d' % (p * 100): values[min(n - 1, int(p * n))] for p in ps} if n else {}
+
+
+def mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def aggregate(level, setting, games):
+    """ statistics of games of one setting """
+    n = len(games)
+    dragons = [g for g in games if g['dragon']]
+    return {
+        'level': level,
+        'setting': setting,
+        'games': n,
+        'dragon_rate': len(dragons) / n,
+        'game_over_rate': sum(g['game_over'] for g in games) / n,
+        'stall_rate': sum(g['stalled'] for g in games) / n,
+        'time_to_dragon': dict(mean=mean([g['game_time'] for g in dragons]),
+                               **percentiles([g['game_time'] for g in dragons])),
+        # how many physics steps bot needed for one combination of the initial plan
+        'steps_per_bfs': mean([g['steps'] / g['bfs_start'] for g in dragons
+                               if g['bfs_start'] not in (0, float('inf'))]),
+        'bfs_end': mean([g['bfs_end'] for g in games if g['bfs_end'] != float('inf')]),
+        'points': dict(mean=mean([g['points'] for g in games]), **percentiles([g['points'] for g in games])),
+        'frame_ms': dict(mean=mean([g['frame_mean'] for g in games]),
+                         max=max(g['frame_max'] for g in games),
+                         **percentiles([g['frame_mean'] for g in games], (0.5, 0.95))),
+        # of one worker, all steps of game including bot
+        'steps_per_s': sum(g['steps'] for g in games) / max(sum(g['elapsed'] for g in games), 1e-9),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-l', '--level', default='medium')
+    parser.add_argument('-p', '--param', type=parse_param, action='append', default=[],
+                        help="difficulty parameter and its values, name=value,value...")
+    parser.add_argument('-g', '--games', type=int, default=10, help="games for each setting")
+    parser.add_argument('-n', '--steps', type=int, default=6000, help="at most, for each game")
+    parser.add_argument('-t', '--stall', type=float, default=60,
+                        help="seconds of game time without progress of plan, after which game ends")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('-s', '--seed', type=int, default=0, help="of first game, then +1 each")
+    parser.add_argument('-o', '--output', default='tune-results.jsonl')
+    args = parser.parse_args()
+
+    settings = grid(args.param)
+    tasks = [(i, args.level, setting, args.seed + g, args.steps, args.stall)
+             for i, setting in enumerate(settings) for g in range(args.games)]
+    print("%d settings x %d games, %d processes" % (len(settings), args.games, args.jobs))
+
+    results = defaultdict(list)
+    done = steps = 0
+    started = time.perf_counter()
+    # spawned workers, kivy's window and GL state don't survive fork well
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(args.jobs, initializer=init_worker) as workers, open(args.output, 'a') as f:
+        for result in workers.imap_unordered(play, tasks):
+            done += 1
+            steps += result['steps']
+            games = results[result['index']]
+            games.append(result)
+            if len(games) < args.games:
+                continue
+
+            setting = settings[result['index']]
+            summary = aggregate(args.level, setting, games)
+            summary['time'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            f.write(json.dumps(summary) + '\n')
+            f.flush()
+            del results[result['index']]
+
+            elapsed = time.perf_counter() - started
+            print("%-50s dragon %3.0f%%  game over %3.0f%%  stalled %3.0f%%  points p50 %5s  "
+                  "%5.0f steps/s/worker  %.0f s left" % (
+                      json.dumps(setting), summary['dragon_rate'] * 100, summary['game_over_rate'] * 100,
+                      summary['stall_rate'] * 100, summary['points'].get('p50'), summary['steps_per_s'],
+                      elapsed / done * (len(tasks) - done)))
+        workers.close()  # let workers exit by themselves, before the pool terminates them
+        workers.join()
+
+    elapsed = time.perf_counter() - started
+    print("done in %.0f s, %d steps, %.0f steps/s in %d processes" % (elapsed, steps, steps / elapsed, args.jobs))
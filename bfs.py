@@ -1,48 +1,205 @@
+""" cheapest way to invent element from set of known elements """
+
 from collections import defaultdict
+from functools import lru_cache
+import heapq
+from itertools import count
 from pprint import pprint
-from random import choice
+
+from elmap import load_elmap
+import timing
+
+INF = float('inf')
 
 
-def reverse_elmap():
-    from element import load_elmap
-    elmap = load_elmap()
+def reverse_elmap(elmap=None):
+    """ map element -> list of (a, b) combinations which produce it """
+    if elmap is None:
+        return load_elmap().reverse
     ret = defaultdict(list)
     for (a, b), c in elmap.items():
         ret[c].append((a, b))
     return ret
 
 
-def bfs(known, end='dragon', pamle=None):
+class Solver(object):
     """
-        return list of steps (a,b)->c
+        finds cheapest derivations of elements
+
+        Reverse recipe graph is built once. Cost of element is 0 when it's known,
+        otherwise 1 + cost of both substrates of its cheapest combination. Costs
+        of all elements are computed at once with Knuth's generalization of
+        Dijkstra's shortest path for hypergraphs, and memoized per known set.
     """
-    assert isinstance(known, set)
-    if not pamle:
-        pamle = reverse_elmap()
-        known = known.copy()
 
-    variants = pamle[end]
-    if not variants:
-        return []
+    def __init__(self, elmap):
+        self.elmap = elmap
+        self.pamle = reverse_elmap(elmap)
+
+        # element -> list of (a, b, c) combinations, where element is substrate
+        self.uses = defaultdict(list)
+        for c, variants in self.pamle.items():
+            for a, b in variants:
+                self.uses[a].append((a, b, c))
+                if b != a:
+                    self.uses[b].append((a, b, c))
+
+    @lru_cache(maxsize=32)
+    def costs(self, known):
+        """ return dict element -> cost, for frozenset of known elements """
+        cost = dict.fromkeys(known, 0)
+        heap = [(0, e) for e in known]
+        done = set()
+
+        while heap:
+            __c, e = heapq.heappop(heap)
+            if e in done:
+                continue
+            done.add(e)
+
+            for a, b, c in self.uses[e]:
+                if c in done or a not in done or b not in done:
+                    continue
+                newcost = cost[a] + cost[b] + 1
+                if newcost < cost.get(c, INF):
+                    cost[c] = newcost
+                    heapq.heappush(heap, (newcost, c))
 
-    retcands = []
-    for substrates in variants:
-        a, b = substrates
-        retcand = [(a, b)]
-        
-        if a not in known or b not in known:
-            for e in (a, b):
-                steps = bfs(known.copy(), e, pamle=pamle)
-                retcand = steps + retcand
+        return cost
 
-        retcands.append(retcand)
+    def steps(self, known, end='dragon'):
+        """
+            return list of steps (a, b) -> c, needed to invent end,
+            or None if end cannot be invented from known
+        """
+        known = frozenset(known)
+        return self.plan(self.costs(known), known, end)
+
+    def plan(self, cost, known, end):
+        """ unroll steps to end from already computed costs """
+        if end not in cost:
+            return None
+
+        ret = []
+        produced = set(known)
+
+        def unroll(e):
+            if e in produced:
+                return
+            produced.add(e)
+            # cheapest variant, first one from elmap if more are equal
+            a, b = min(self.pamle[e], key=lambda v: cost.get(v[0], INF) + cost.get(v[1], INF))
+            unroll(b)
+            unroll(a)
+            ret.append((a, b))
+
+        unroll(end)
+        return ret
+
+
+class Planner(object):
+    """
+        keeps plan of reaching end up to date while elements are discovered
+
+        Known elements only grow, so costs only decrease. Discovery propagates
+        decreased costs to the combinations which use changed elements, instead
+        of solving everything again. Steps of the plan wait in hint queue,
+        ordered by how many times they were already shown.
+    """
 
-    retcands.sort(key=lambda x: len(x))
+    def __init__(self, solver, known, end='dragon'):
+        self.solver = solver
+        self.end = end
+        self.known = set(known)
+        self.cost = dict(solver.costs(frozenset(known)))
+        self.steps = None
+        self.planned = set()
+        self.hints_stats = defaultdict(int)
+        self.queue = []  # heap of (times shown, order, (a, b))
+        self.order = count()
+        self.replan()
 
-    return retcands[0]
+    @property
+    def remaining(self):
+        """ number of steps to reach end """
+        return len(self.steps) if self.steps is not None else INF
+
+    @timing.timed('solver.discover')
+    def discover(self, elname):
+        """ elname becomes known, return True if plan was updated """
+        if elname in self.known:
+            return False
+        self.known.add(elname)
+
+        cost = self.cost
+        cost[elname] = 0
+        heap = [(0, elname)]
+        while heap:
+            c, e = heapq.heappop(heap)
+            if c > cost[e]:
+                continue
+            for a, b, r in self.solver.uses[e]:
+                newcost = cost.get(a, INF) + cost.get(b, INF) + 1
+                if newcost < cost.get(r, INF):
+                    cost[r] = newcost
+                    heapq.heappush(heap, (newcost, r))
+
+        self.replan()
+        return True
+
+    def replan(self):
+        self.steps = self.solver.plan(self.cost, self.known, self.end)
+        planned = set(self.steps or ())
+        for step in self.steps or ():
+            if step not in self.planned:
+                heapq.heappush(self.queue, (self.hints_stats[step], next(self.order), step))
+        self.planned = planned
+
+    @timing.timed('solver.pop_hint')
+    def pop_hint(self, visible=()):
+        """ return (a, b, c) least shown step of plan, which is not visible """
+        skipped = []
+        ret = None
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            shown, __, step = entry
+            if step not in self.planned or shown != self.hints_stats[step]:
+                continue  # stale entry
+            if step in visible:
+                skipped.append(entry)
+                continue
+            ret = step
+            break
+
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+
+        if ret is None:
+            return None
+
+        self.hints_stats[ret] += 1
+        heapq.heappush(self.queue, (self.hints_stats[ret], next(self.order), ret))
+        a, b = ret
+        return a, b, self.solver.elmap[ret]
+
+
+def solver():
+    """ solver for the game elmap, built once """
+    if solver.instance is None:
+        solver.instance = Solver(load_elmap().recipes)
+    return solver.instance
+
+
+solver.instance = None
+
+
+def bfs(known, end='dragon'):
+    """
+        return list of steps (a,b)->c
+    """
+    assert isinstance(known, set)
+    return solver().steps(known, end)
 
 
 if __name__ == '__main__':
-    # import timeit
-    # print(timeit.timeit(lambda: bfs({'water', 'fire', 'air', 'earth'}, 'dragon'), number=1000))
     pprint(bfs({'water', 'fire', 'air', 'earth'}, 'dragon'))
@@ -2,10 +2,20 @@
 
 syslog_host= ("dlaptop", 5555)
 
-fps = 20
+fps = 60  # frames drawn per second
+
+physics_rate = 20  # physics and game logic steps per second, independent of fps
+physics_substeps = 3  # space steps per physics step, so fast bullets don't tunnel
+max_physics_steps = 5  # at most per frame, long frames slow the game down rather than pile up
+sleep_time_threshold = 0.5  # seconds of resting after which body falls asleep
+sync_distance = 0.25  # widget follows its body when it moved more than that (pixels)
+sync_angle = 0.2  # or rotated more than that (degrees)
+batch_elements = True  # draw all elements with few meshes, instead of each element by itself
+record_dir = None  # directory to save recording of each game into, see replay.py
 
 gravity = (0, -750)
 baloon_force = (300, 7900)
+points_acceleration = (30, 40)  # of score floats, like baloon_force lifting mass of 10
 max_hints = 3
 
 friction = 0.55
@@ -35,6 +45,17 @@ explode_when_nocomb = False  # explode elements when they make impossible combin
 left_beam_fine_pos = 0
 beam_speed = 20  # number of pixels per minute
 
+LEVELS = {
+    'easy': dict(explode_when_nocomb=0.9, drop_useless_chance=0.0, left_beam_fine_pos=-130, beam_speed=10),
+    'medium': dict(explode_when_nocomb=0.5, drop_useless_chance=0.3, left_beam_fine_pos=-10, beam_speed=20),
+    'hard': dict(explode_when_nocomb=0.01, drop_useless_chance=0.45, left_beam_fine_pos=+5, beam_speed=60),
+}
+
+
+# parameters of game which levels can change, each world has them in its Difficulty
+DIFFICULTY = ('skip_drop_time', 'drop_useless_chance', 'drop_chance', 'drop_zone', 'num_elements_in_zone',
+              'explode_when_nocomb', 'left_beam_fine_pos', 'beam_speed')
+
 # constants
 
 NORMAL_LAYER = 1
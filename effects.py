@@ -0,0 +1,208 @@
+"""
+    transient visual effects: explosions with debris, sparkles of merged
+    elements and score floats
+
+    Effects are not widgets and have no bodies. Each sprite is a row of
+    parallel arrays (start position, velocity, acceleration, time of birth,
+    life length, size and texture), its position is computed from time since
+    birth, so nothing is simulated between frames. Frame animations (like
+    explosion) are rows of their own, fewer, arrays. Dead effects are
+    swap-removed, the last row takes place of each. All live effects are
+    written once per frame into vertex arrays of spritebatch, which are reused
+    from frame to frame, one per texture: an atlas page for all sprites, and
+    one texture with glyphs of all score floats, which are a sprite per
+    character. Without NumPy, positions are still computed effect by effect.
+"""
+
+from array import array
+from math import cos, pi, sin
+import random
+
+from kivy.core.text import Label as CoreLabel
+
+from anim import FrameAnimation
+import defs
+import spritebatch
+
+POINTS_LIFE = 5.0  # seconds score float is shown
+POINTS_FADE = 1.0  # it fades out during last seconds of life
+POINTS_FONT = ('fonts/PfefferMediaeval.otf', 80)
+GLYPHS = "+-0123456789"  # characters of score floats
+
+DEBRIS = 6  # pieces flying from each exploded element
+DEBRIS_LIFE = 0.8
+DEBRIS_SIZE = 12
+DEBRIS_SPEED = (150, 450)
+
+SPARKLES = 10  # around merged elements
+SPARKLE_LIFE = 0.5
+SPARKLE_SIZE = 10
+SPARKLE_SPEED = (80, 180)
+SPARKLE_COLOR = (1.0, 1.0, 0.7, 1.0)
+
+
+def glyphs():
+    """ char -> texture region of it, for all GLYPHS rendered into one texture
+        in POINTS_FONT, white so that it can be tinted """
+    if glyphs.data is not None:
+        return glyphs.data
+
+    font_name, font_size = POINTS_FONT
+    label = CoreLabel(text=GLYPHS, font_name=font_name, font_size=font_size)
+    label.refresh()
+    texture = label.texture
+    glyphs.data = {}
+    for k, char in enumerate(GLYPHS):
+        x0 = label.get_extents(GLYPHS[:k])[0] if k else 0
+        x1 = label.get_extents(GLYPHS[:k + 1])[0]
+        glyphs.data[char] = texture.get_region(x0, 0, x1 - x0, texture.height)
+    return glyphs.data
+
+
+glyphs.data = None
+
+
+EXPLOSION = FrameAnimation(["explosion%02d" % i for i in range(1, 6)], duration=0.3, sizes=(100, 18))
+
+
+class Effects(object):
+    """ all effects of one game, drawn by its context """
+
+    def __init__(self, get_time):
+        self.get_time = get_time  # game time, effects stop with game's clocks
+        self.rng = random.Random(0)  # own, effects don't change random numbers of game
+        self.context = spritebatch.batch_context()
+        self.buffers = {}  # texture id -> spritebatch.QuadBuffer
+        self.meshes = {}  # texture id -> Mesh
+
+        # sprites
+        self.x = array('d')
+        self.y = array('d')
+        self.vx = array('d')
+        self.vy = array('d')
+        self.ax = array('d')
+        self.ay = array('d')
+        self.born = array('d')
+        self.life = array('d')
+        self.fades = array('d')  # seconds of fading out before end of life
+        self.w = array('d')
+        self.h = array('d')
+        self.textures = []
+        self.colors = []
+
+        # frame animations, they don't move
+        self.anim_x = array('d')
+        self.anim_y = array('d')
+        self.anim_born = array('d')
+        self.anim_life = array('d')
+        self.animations = []
+
+    def __len__(self):
+        return len(self.born) + len(self.anim_born)
+
+    def columns(self):
+        return (self.x, self.y, self.vx, self.vy, self.ax, self.ay, self.born, self.life, self.fades,
+                self.w, self.h, self.textures, self.colors)
+
+    def anim_columns(self):
+        return (self.anim_x, self.anim_y, self.anim_born, self.anim_life, self.animations)
+
+    def spawn(self, texture, pos, life, velocity=(0, 0), acceleration=(0, 0), color=(1, 1, 1, 1), fade=0,
+              size=None):
+        """ add sprite of texture, shown around pos from now for life seconds,
+            in its own size or size """
+        x, y = pos
+        vx, vy = velocity
+        ax, ay = acceleration
+        w, h = size or texture.size
+        values = (x, y, vx, vy, ax, ay, self.get_time(), life, fade, w, h, texture, color)
+        for column, v in zip(self.columns(), values):
+            column.append(v)
+
+    def play(self, animation, pos):
+        """ add FrameAnimation, played around pos from now """
+        x, y = pos
+        values = (x, y, self.get_time(), animation.duration, animation)
+        for column, v in zip(self.anim_columns(), values):
+            column.append(v)
+
+    def scatter(self, texture, pos, n, life, speed, size, color=(1, 1, 1, 1), acceleration=(0, 0)):
+        """ n small sprites of texture flying from pos to all sides, fading out """
+        rng = self.rng
+        for k in range(n):
+            angle = 2 * pi * (k + rng.random()) / n
+            v = rng.uniform(*speed)
+            self.spawn(texture, pos, life, velocity=(v * cos(angle), v * sin(angle)),
+                       acceleration=acceleration, color=color, fade=life, size=(size, size))
+
+    def explosion(self, pos, debris=()):
+        """ explosion at pos, with pieces of sprites debris (of exploded elements) """
+        self.play(EXPLOSION, pos)
+        for texture in debris:
+            self.scatter(texture, pos, DEBRIS, DEBRIS_LIFE, DEBRIS_SPEED, DEBRIS_SIZE,
+                         acceleration=defs.gravity)
+
+    def sparkles(self, pos, texture):
+        """ elements merged at pos into element of sprite texture """
+        self.scatter(texture, pos, SPARKLES, SPARKLE_LIFE, SPARKLE_SPEED, SPARKLE_SIZE, color=SPARKLE_COLOR)
+
+    def points(self, pos, points):
+        """ "+5" or "-1" floating up from pos, sprite of glyph for each character """
+        color = (1, 0, 0, 1) if points < 0 else (0, 0.8, 0.2, 1)
+        chars = [glyphs()[c] for c in "%+d" % points]
+        x, y = pos
+        x -= sum(c.width for c in chars) / 2
+        for c in chars:
+            self.spawn(c, (x + c.width / 2, y), POINTS_LIFE,
+                       acceleration=defs.points_acceleration, color=color, fade=POINTS_FADE)
+            x += c.width
+
+    def expire(self, now):
+        """ forget effects which lived their life, the last one takes place of each """
+        for born, life, columns in ((self.born, self.life, self.columns()),
+                                    (self.anim_born, self.anim_life, self.anim_columns())):
+            i = 0
+            while i < len(born):
+                if now - born[i] < life[i]:
+                    i += 1
+                    continue
+                for column in columns:
+                    column[i] = column[-1]
+                    column.pop()
+
+    def buffer(self, texture):
+        buf = self.buffers.get(texture.id)
+        if buf is None:
+            buf = self.buffers[texture.id] = spritebatch.QuadBuffer(texture)
+        return buf
+
+    def update(self, now):
+        """ draw effects as they are at game time now """
+        self.expire(now)
+
+        anim_x, anim_y, anim_born = self.anim_x, self.anim_y, self.anim_born
+        for i, animation in enumerate(self.animations):
+            texture, size = animation.frame(now - anim_born[i])
+            px, py, half = anim_x[i], anim_y[i], size / 2
+            self.buffer(texture).add(texture, px - half, py - half, px + half, py + half, 1, 1, 1, 1)
+
+        buffers = self.buffers
+        x, y, vx, vy, ax, ay = self.x, self.y, self.vx, self.vy, self.ax, self.ay
+        born, life, fades, ws, hs = self.born, self.life, self.fades, self.w, self.h
+        for i, texture in enumerate(self.textures):
+            t = now - born[i]
+            px = x[i] + (vx[i] + ax[i] * t / 2) * t
+            py = y[i] + (vy[i] + ay[i] * t / 2) * t
+            w, h = ws[i] / 2, hs[i] / 2
+
+            r, g, b, a = self.colors[i]
+            left = life[i] - t
+            if left < fades[i]:
+                a *= left / fades[i]
+
+            buf = buffers.get(texture.id)
+            if buf is None:
+                buf = self.buffer(texture)
+            buf.add(texture, px - w, py - h, px + w, py + h, r, g, b, a)
+
+        spritebatch.flush_buffers(self.context, self.meshes, buffers)
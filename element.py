@@ -1,87 +1,19 @@
 """ element (elementary ingredients of matter) and managing it """
 
 from functools import partial
-from random import choice, random, sample
-import re
-import os
 
 from cymunk import PivotJoint
+from kivy.graphics import Color, Ellipse, Rectangle
 from kivy.logger import Logger
-from kivy.properties import BooleanProperty, NumericProperty
-from kivy.vector import Vector
+from kivy.properties import BooleanProperty, ObjectProperty
 
 from anim import AnimObject
-import bfs
+from assets import sprite
 import defs
-from utils import shuffled
+from elmap import BASE_ELNAMES, NOTHING, load_elmap
+from utils import choice_bit
 from snd import Sounds
-
-
-def load_elmap():
-    """ load elmap from data/elmap.txt"""
-    if load_elmap.data:
-        return load_elmap.data
-
-    fname = "data/elmap.txt"
-    if "DEBUG" in os.environ:
-        fname = "data/elmap-DEBUG.txt"
-
-    with open(fname) as f:
-        for line in f:
-            g = re.match(r"^(.*)=(.*)\+(.*)$", line)
-            if not g:
-                continue
-            c = g.group(1).strip()
-            a = g.group(2).strip()
-            b = g.group(3).strip()
-
-            key = tuple(sorted([a, b]))
-            assert key not in load_elmap.data, "duplicate combination %s" % key
-            load_elmap.data[key] = c
-
-    return load_elmap.data
-
-
-load_elmap.data = {}
-
-
-def combine_elements(a, b):
-    """ check in elmap, if (a,b) pair should generate
-        something else """
-
-    elmap = load_elmap()
-
-    try:
-        return elmap[tuple(sorted([a, b]))]
-    except KeyError:
-        return None
-
-
-class Explosion(AnimObject):
-    """ widget/object which shows explosion on the screen """
-
-    frame = NumericProperty(1)
-
-    def __init__(self, momentum=None, *a, **kw):
-        super(Explosion, self).__init__(*a, **kw)
-        self.layers = defs.VISUAL_EFFECTS_LAYER
-
-    def update(self, dt):
-        if self.parent is None:
-            Logger.info("self=%s self.parent=%s self.frame=%s but parent is None",
-                        self, self.parent, self.frame)
-            return
-        if self.frame > 5:
-            self.parent.remove_obj(self)
-            return
-        self.frame += 1
-
-        # dirty hack, how to do it otherwise?
-        oldsize = sum(self.size)/2
-        size = (100*(5 - self.frame) + 18*(self.frame-1))/4
-        ds = oldsize - size
-        self.size = (size, size)
-        self.pos = Vector(self.pos) + (ds/2, ds/2)
+import timing
 
 
 class Element(AnimObject):
@@ -89,20 +21,44 @@ class Element(AnimObject):
     collision_type = 1
     # is activated when shooted, and then it combine with other element
     activated = BooleanProperty(False)
+    texture = ObjectProperty(None, allownone=True)  # sprite of element
+    pooled = True
+    batched = defs.batch_elements
 
-    available_elnames = {'water', 'air', 'earth', 'fire'}
-    present_elnames = []
-    shown_baloons = set()
+    color = (1.0, 1.0, 1.0, 1.0)
+    activated_color = (0.0, 0.9, 0.5, 1.0)
 
     def __init__(self, elname, activate=False, momentum=None, *a, **kw):
         """
             momentum - that linear one, mass*V
         """
         Logger.debug("new element kwargs=%s, momentum=%s", kw, momentum)
-        self.elname = elname
+        self.elname = elname  # before kv rules are applied, they show repr() of element
         super(Element, self).__init__(*a, **kw)
-
-        self.imgsrc = "img/" + elname + ".png"
+        if not self.batched:
+            self.draw()
+        self.init_state(elname, activate, momentum)
+
+    def draw(self):
+        """ draw element by itself, when it's not drawn by game's ElementBatch """
+        with self.canvas:
+            self.tint = Color(*self.color)
+            self.disc = Ellipse(pos=self.pos, size=self.size)
+            self.sprite = Rectangle(pos=self.pos, size=self.size, texture=self.texture)
+        self.bind(pos=self.redraw, size=self.redraw, texture=self.redraw, activated=self.redraw)
+
+    def redraw(self, *__args):
+        self.tint.rgba = self.activated_color if self.activated else self.color
+        self.disc.pos = self.sprite.pos = self.pos
+        self.disc.size = self.sprite.size = self.size
+        self.sprite.texture = self.texture
+
+    def init_state(self, elname, activate, momentum):
+        """ state of new element, also when it's recycled """
+        self.elname = elname
+        self.elid = load_elmap().ids[elname]
+        self.texture = sprite(elname)
+        self.activated = False
         self.layers = defs.NORMAL_LAYER
         self.wizard = None  # who carry element?
         self.joint_in_use = None
@@ -112,7 +68,14 @@ class Element(AnimObject):
         if activate:
             self.activate()
 
-        self.present_elnames.append(elname)
+        self.world.discovery.present_elnames.append(elname)
+
+    def recycle(self, elname, activate=False, momentum=None, **kw):
+        self.init_state(elname, activate, momentum)
+        super(Element, self).recycle(**kw)
+
+    def on_release(self):
+        self.unjoint()
 
     def __repr__(self):
         return "[E:%s id=%s]" % (self.elname, id(self))
@@ -122,23 +85,24 @@ class Element(AnimObject):
 
     def on_body_init(self):
         assert self.parent is not None
-        if self.elname not in self.shown_baloons:
-            self.shown_baloons.add(self.elname)
+        shown_baloons = self.world.discovery.shown_baloons
+        if self.elname not in shown_baloons:
+            shown_baloons.add(self.elname)
             self.show_baloon(self.elname)
-            self.parent.set_bfs()
             if self.momentum:
                 self.body.velocity = self.momentum / self.body.mass
 
     def before_removing(self):
-        self.present_elnames.remove(self.elname)
+        self.world.discovery.present_elnames.remove(self.elname)
 
     def activate(self, __dt=None, timeout=0.3):
         """ make it green and ready to react with other element """
         if timeout == 'now':
             self.activated = True
             self.shape.layers = defs.NORMAL_LAYER
-            if 'activation' not in self.shown_baloons:
-                self.shown_baloons.add('activation')
+            shown_baloons = self.world.discovery.shown_baloons
+            if 'activation' not in shown_baloons:
+                shown_baloons.add('activation')
                 self.show_baloon('activated \nready to reaction', size=(150, 80))
             return
 
@@ -148,6 +112,7 @@ class Element(AnimObject):
         self.unjoint()
         self.joint_in_use = PivotJoint(self.body, with_who.body, point)
         self.space.add(self.joint_in_use)
+        self.body.activate()  # it was moved by hand, maybe while sleeping
 
     def unjoint(self):
         """ remove existing joint """
@@ -172,104 +137,122 @@ class Element(AnimObject):
         if self.parent is None:
             Logger.debug("hey, my parent is still none, (and me=%s)", self)
             return
-        new_elname = combine_elements(self.elname, element.elname)
-
-        if new_elname is None:
-            if random() < defs.explode_when_nocomb:
-                self.parent.replace_objs([self, element], Explosion, center=self.center)
+        elmap = load_elmap()
+        new_elid = elmap.combine(self.elid, element.elid)
+
+        if new_elid == NOTHING:
+            if self.world.rng.random() < self.world.difficulty.explode_when_nocomb:
+                self.parent.remove_obj(self)
+                self.parent.remove_obj(element)
+                self.parent.effects.explosion(self.center, debris=(self.texture, element.texture))
                 self.parent.elements_in_zone.remove(element)
                 self.parent.elements_in_zone.remove(self)
                 return -1
             return None
 
-        self.available_elnames.add(new_elname)
+        new_elname = elmap.names[new_elid]
+        self.world.discovery.discover(new_elname)
         self.parent.reached_elname(new_elname)
 
+        self.parent.effects.sparkles(self.center, sprite(new_elname))
         self.parent.replace_objs([self, element], Element, new_elname, activate=True)
         self.parent.elements_in_zone.remove(element)
         self.parent.elements_in_zone.remove(self)
 
         self.parent.rotate_hint()
 
-        Sounds.merge.play()
+        if Sounds.merge:
+            Sounds.merge.play()
 
         return +5
 
     @classmethod
-    def random(cls, elizo):
-        """ generate random element from available.
+    def random(cls, world, elizo):
+        """ new random element of world, see Discovery.random_elname """
+        return cls.acquire(world, world.discovery.random_elname(world.rng, elizo,
+                                                                world.difficulty.drop_useless_chance))
+
+
+class Discovery(object):
+    """ elements discovered in one game, and which of them are worth dropping """
+
+    def __init__(self):
+        self.available_elnames = set(BASE_ELNAMES)
+        # useful partners index, see build_useful_index
+        self.available_mask = 0
+        self.partners = None
+        self.present_elnames = []
+        self.shown_baloons = set()
+
+    @timing.timed('solver.random')
+    def random_elname(self, rng, elizo, drop_useless_chance):
+        """ name of random element from available.
 
             Generate useful element, depending on drop_useless_chance
 
 `           elizo - elements in zone, list of Element instances
 
         """
-        Logger.debug("Element.random: elizo=%s available_elnames=%s", elizo, cls.available_elnames)
-
-        all_elnames = [x.elname for x in elizo]
-        green_elnames = [x.elname for x in elizo if x.activated]
-        white_elnames = [x.elname for x in elizo if not x.activated]
+        Logger.debug("Element.random: elizo=%s available_elnames=%s", elizo, self.available_elnames)
+
+        if self.partners is None:
+            self.build_useful_index()
+        names = load_elmap().names
+
+        white_mask = 0  # elements which lay just by wizard (to not duplicate them)
+        green_partners = 0  # elements which give something new with GREEN elements in zone
+        all_partners = 0  # elements which give something new with ANY elements in zone
+        for x in elizo:
+            all_partners |= self.partners[x.elid]
+            if x.activated:
+                green_partners |= self.partners[x.elid]
+            else:
+                white_mask |= 1 << x.elid
 
         # first - check if we can just drop enything
-        if random() < defs.drop_useless_chance: 
-            elname = choice(list(cls.available_elnames))
+        if rng.random() < drop_useless_chance: 
             Logger.debug("elements: appear pure random element")
-            return Element(elname)
-
-        Logger.debug("second")
-        # try to drop element E (which is not in zone) which combined with GREEN elements in zone will give 
-        # element R which is new
-        for x in shuffled(set(cls.available_elnames) - set(white_elnames)):
-            #iterate over all availables except those which lay just by wizard
-            # (to not duplicate them)
-            
-            if cls.is_useful(x, with_elnames=green_elnames, avoid=cls.available_elnames):
-                return Element(elname=x)
-
-        Logger.debug("third")
-        # try to drop element E (which is not in zone) which combined with ANY elements in zone will give 
-        # element R which is new
-        for x in shuffled(set(cls.available_elnames) - set(white_elnames)):
-            #iterate over all availables except those which lay just by wizard
-
-            if cls.is_useful(x, with_elnames=all_elnames, avoid=cls.available_elnames):
-                return Element(elname=x)
+            return names[choice_bit(self.available_mask, rng)]
+
+        # second - try to drop element E (which is not in zone) which combined with GREEN elements in zone will give 
+        # element R which is new, third - the same with ANY elements in zone
+        candidates = self.available_mask & ~white_mask
+        for useful in (candidates & green_partners, candidates & all_partners):
+            if useful:
+                return names[choice_bit(useful, rng)]
 
         # Nothing useful, drop random
-        ret = choice(list(cls.available_elnames))
+        ret = names[choice_bit(self.available_mask, rng)]
         Logger.debug("fourth nothing useful, drop pure random(%s)", ret)
-        return Element(ret)
-
-
-    @classmethod
-    def steps_to_reach(cls):
-        """ how many inventions neccessary to reach dragon """
-        Logger.debug("steps_to_reach(): cls.available_elnames=%s, dest='dragon'", cls.available_elnames)
-        ret = bfs.bfs(cls.available_elnames, 'dragon')
-        Logger.debug("returned %s", ret)
         return ret
 
-    @classmethod
-    def is_useful(cls, elname, with_elnames, avoid):
-        """ combine elname with each of with_elnames and check if it can
-            bring something new to elnames, but source element should not belong to 'avoid'  """
-
-        Logger.debug("is_useful elname=%s with=%s avoid=%s", elname, with_elnames, avoid)
-
-        for x in with_elnames:
-            result = combine_elements(x, elname)
-            if not result:
-                continue
-            if result in avoid:  # don't produce something we already know
-                continue
-            
-            Logger.debug("USEFUL: elname=%s, with_elnames=%s avoid=%s:  %s + %s gives %s", elname, with_elnames, avoid, elname, x, result)
-            return True
-
-        return False
-
-    @classmethod
-    def reset(cls):
-        cls.available_elnames = {'water', 'air', 'earth', 'fire'}
-        cls.present_elnames = []
-        cls.shown_baloons = set()
+    def build_useful_index(self):
+        """ for each element id, make bitmask of ids of elements which combined
+            with it give element not available yet """
+        elmap = load_elmap()
+        ids = elmap.ids
+
+        self.available_mask = 0
+        for elname in self.available_elnames:
+            self.available_mask |= 1 << ids[elname]
+
+        self.partners = partners = [0] * elmap.size
+        for (a, b), c in elmap.recipes.items():
+            if c not in self.available_elnames:
+                i, j = ids[a], ids[b]
+                partners[i] |= 1 << j
+                partners[j] |= 1 << i
+
+    def discover(self, elname):
+        """ make elname available, and forget combinations which give it in useful index """
+        self.available_elnames.add(elname)
+        if self.partners is None:
+            return  # will be built with elname already available
+
+        elmap = load_elmap()
+        ids = elmap.ids
+        self.available_mask |= 1 << ids[elname]
+        for a, b in elmap.reverse.get(elname, ()):
+            i, j = ids[a], ids[b]
+            self.partners[i] &= ~(1 << j)
+            self.partners[j] &= ~(1 << i)
@@ -0,0 +1,191 @@
+"""
+    elmap - which two elements combined give another one
+
+    data/elmap.txt is compiled into data/elmap.bin (make elmaps, or
+    python elmap.py data/elmap.txt), which is loaded at runtime when it's
+    up to date with the text source.
+"""
+
+from array import array
+from collections import defaultdict
+import hashlib
+import os
+import pickle
+import re
+import sys
+
+BASE_ELNAMES = ('water', 'air', 'earth', 'fire')
+GOAL_ELNAME = 'dragon'
+NOTHING = -1  # id of combination result, when elements don't combine
+
+VERSION = 1  # of compiled elmap, bump when ElMap attributes change
+
+
+class ElmapError(ValueError):
+    """ elmap source is broken """
+
+
+class ElMap(object):
+    """
+        combinations of elements, with element names interned to small
+        integers. Result of combination of elements with ids i and j is
+        in symmetric table at i * size + j.
+    """
+
+    def __init__(self, recipes):
+        """ recipes - dict (a, b) -> c, where a, b are sorted """
+        self.recipes = recipes
+
+        names = set(BASE_ELNAMES)
+        for (a, b), c in recipes.items():
+            names.update((a, b, c))
+        self.names = sorted(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.size = size = len(self.names)
+
+        self.table = table = array('h', [NOTHING]) * (size * size)
+        for (a, b), c in recipes.items():
+            i, j = self.ids[a], self.ids[b]
+            table[i * size + j] = table[j * size + i] = self.ids[c]
+
+        # element -> list of (a, b) combinations which produce it
+        self.reverse = defaultdict(list)
+        for (a, b), c in recipes.items():
+            self.reverse[c].append((a, b))
+
+        # elements which can be invented from base elements
+        self.reachable = reachable = set(BASE_ELNAMES)
+        growing = True
+        while growing:
+            growing = False
+            for (a, b), c in recipes.items():
+                if c not in reachable and a in reachable and b in reachable:
+                    reachable.add(c)
+                    growing = True
+
+    def combine(self, i, j):
+        """ id of element made of elements with ids i and j, or NOTHING """
+        return self.table[i * self.size + j]
+
+    def problems(self):
+        """ list of warnings about elements which are never used in game """
+        ret = []
+        for name in self.names:
+            if name not in self.reverse and name not in BASE_ELNAMES:
+                ret.append("orphan element %s, no combination gives it" % name)
+        for c in sorted(self.reverse):
+            if c not in self.reachable:
+                ret.append("unreachable element %s" % c)
+        return ret
+
+
+def parse_elmap(fname):
+    """ read dict (a, b) -> c from elmap text source """
+    recipes = {}
+    lines = {}
+    with open(fname) as f:
+        for lineno, line in enumerate(f, 1):
+            g = re.match(r"^(.*)=(.*)\+(.*)$", line)
+            if not g:
+                continue
+            c = g.group(1).strip()
+            a = g.group(2).strip()
+            b = g.group(3).strip()
+
+            key = tuple(sorted([a, b]))
+            if key in recipes:
+                raise ElmapError("%s:%s: duplicate combination %s + %s, already at line %s" %
+                                 (fname, lineno, a, b, lines[key]))
+            recipes[key] = c
+            lines[key] = lineno
+
+    return recipes
+
+
+def source_stamp(fname):
+    """ (mtime, size, sha1) of elmap source """
+    with open(fname, 'rb') as f:
+        sha1 = hashlib.sha1(f.read()).hexdigest()
+    st = os.stat(fname)
+    return st.st_mtime, st.st_size, sha1
+
+
+def compiled_name(fname):
+    return os.path.splitext(fname)[0] + '.bin'
+
+
+def compile_elmap(fname):
+    """ parse and check elmap source, and store it next to source """
+    elmap = ElMap(parse_elmap(fname))
+    if GOAL_ELNAME not in elmap.reachable:
+        raise ElmapError("%s: %s cannot be invented from %s" %
+                         (fname, GOAL_ELNAME, ", ".join(BASE_ELNAMES)))
+
+    data = pickle.dumps({'version': VERSION,
+                         'source': source_stamp(fname),
+                         'elmap': vars(elmap)}, pickle.HIGHEST_PROTOCOL)
+    with open(compiled_name(fname), 'wb') as f:
+        f.write(data)
+
+    return elmap
+
+
+def read_compiled(fname):
+    """ return compiled elmap for source fname, or None if it's missing or stale """
+    try:
+        with open(compiled_name(fname), 'rb') as f:
+            data = pickle.loads(f.read())
+    except OSError:
+        return None
+    except Exception as e:  # truncated or incompatible artifact
+        from kivy.logger import Logger  # here, so that compiling elmap doesn't need kivy
+        Logger.warning("elmap: cannot read %s (%s)", compiled_name(fname), e)
+        return None
+
+    if not isinstance(data, dict) or data.get('version') != VERSION:
+        return None
+
+    if os.path.exists(fname):
+        mtime, size, sha1 = data['source']
+        st = os.stat(fname)
+        if (st.st_mtime, st.st_size) != (mtime, size) and source_stamp(fname)[2] != sha1:
+            return None
+
+    elmap = ElMap.__new__(ElMap)
+    vars(elmap).update(data['elmap'])
+    return elmap
+
+
+def load_elmap():
+    """ load elmap from data/elmap.txt"""
+    if load_elmap.data:
+        return load_elmap.data
+
+    fname = "data/elmap.txt"
+    if "DEBUG" in os.environ:
+        fname = "data/elmap-DEBUG.txt"
+
+    elmap = read_compiled(fname)
+    if elmap is None:
+        from kivy.logger import Logger
+        Logger.info("elmap: %s is missing or stale, parsing %s", compiled_name(fname), fname)
+        elmap = ElMap(parse_elmap(fname))
+        for problem in elmap.problems():
+            Logger.warning("elmap: %s: %s", fname, problem)
+
+    load_elmap.data = elmap
+    return load_elmap.data
+
+
+load_elmap.data = None
+
+
+if __name__ == '__main__':
+    for fname in sys.argv[1:]:
+        try:
+            elmap = compile_elmap(fname)
+        except ElmapError as e:
+            sys.exit("elmap: %s" % e)
+        for problem in elmap.problems():
+            print("%s: warning: %s" % (fname, problem), file=sys.stderr)
+        print("%s: %s elements, %s combinations" % (compiled_name(fname), elmap.size, len(elmap.recipes)))
@@ -0,0 +1,136 @@
+"""
+    state of physics objects in parallel arrays
+
+    Each object added to space gets a slot. After physics step, positions and
+    angles of awake bodies are read into arrays, and when frame is drawn,
+    state interpolated from them is written to shown arrays. Widgets which
+    moved noticeably are moved there too, except of batched ones (elements
+    drawn by spritebatch.ElementBatch from shown arrays), whose widgets are
+    moved only after physics steps, for game logic. So most bodies don't
+    touch widget properties every frame. Slots of removed objects are
+    reused, so arrays don't grow over game.
+
+    Both passes are Python loops over slots, the game doesn't depend on
+    NumPy to do them at once.
+"""
+
+from array import array
+from math import degrees
+
+import defs
+
+# flags of slot
+STATIC = 1  # body is not simulated (or slot is free)
+SLEEPING = 2
+SHOWN = 4  # widget was moved to its body at least once
+BATCHED = 8  # drawn from shown arrays, widget follows body only after physics step
+
+
+class EntityStore(object):
+
+    def __init__(self):
+        self.objects = []  # slot -> object, None when free
+        self.bodies = []
+        self.flags = array('B')
+        # state after last physics step
+        self.x = array('d')
+        self.y = array('d')
+        self.angle = array('d')
+        # state before it
+        self.prev_x = array('d')
+        self.prev_y = array('d')
+        self.prev_angle = array('d')
+        # state widget shows
+        self.shown_x = array('d')
+        self.shown_y = array('d')
+        self.shown_angle = array('d')
+        self.free = []
+
+    def __len__(self):
+        return len(self.objects) - len(self.free)
+
+    def add(self, obj):
+        """ add object with body, return its slot """
+        body = obj.body
+        x, y = body.position
+        angle = body.angle
+        flags = (STATIC if obj.static else 0) | (BATCHED if obj.batched else 0)
+
+        if self.free:
+            i = self.free.pop()
+            self.objects[i] = obj
+            self.bodies[i] = body
+            self.flags[i] = flags
+            for a, v in zip(self.arrays(), (x, y, angle) * 3):
+                a[i] = v
+        else:
+            i = len(self.objects)
+            self.objects.append(obj)
+            self.bodies.append(body)
+            self.flags.append(flags)
+            for a, v in zip(self.arrays(), (x, y, angle) * 3):
+                a.append(v)
+        return i
+
+    def remove(self, i):
+        self.objects[i] = None
+        self.bodies[i] = None
+        self.flags[i] = STATIC
+        self.free.append(i)
+
+    def arrays(self):
+        return (self.x, self.y, self.angle, self.prev_x, self.prev_y, self.prev_angle,
+                self.shown_x, self.shown_y, self.shown_angle)
+
+    def save_previous(self):
+        """ before physics step """
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.prev_angle[:] = self.angle
+
+    def refresh(self):
+        """ after physics step, copy state of bodies which are simulated and
+            awake, and move widgets of batched objects to it """
+        x, y, angle, flags, objects = self.x, self.y, self.angle, self.flags, self.objects
+        for i, body in enumerate(self.bodies):
+            f = flags[i]
+            if f & STATIC:
+                continue
+            if body.is_sleeping:
+                flags[i] = f | SLEEPING
+                continue
+            flags[i] = f & ~SLEEPING
+            x[i], y[i] = body.position
+            angle[i] = body.angle
+            if f & BATCHED:
+                objects[i].show(x[i], y[i], degrees(angle[i]))
+
+    def sync(self, alpha):
+        """ shown state, alpha of the way from previous physics state to the
+            last one. Widgets are moved to it, except of batched ones and
+            those which didn't move noticeably """
+        x, y, angle, flags = self.x, self.y, self.angle, self.flags
+        prev_x, prev_y, prev_angle = self.prev_x, self.prev_y, self.prev_angle
+        shown_x, shown_y, shown_angle = self.shown_x, self.shown_y, self.shown_angle
+        dist, dang = defs.sync_distance, defs.sync_angle
+
+        for i, obj in enumerate(self.objects):
+            f = flags[i]
+            if f & (STATIC | SLEEPING):
+                continue
+
+            px, py, pa = prev_x[i], prev_y[i], prev_angle[i]
+            nx = px + (x[i] - px) * alpha
+            ny = py + (y[i] - py) * alpha
+            if f & BATCHED:
+                shown_x[i], shown_y[i] = nx, ny
+                continue
+
+            na = degrees(pa + (angle[i] - pa) * alpha)
+            if (f & SHOWN and abs(nx - shown_x[i]) <= dist and abs(ny - shown_y[i]) <= dist
+                    and abs(na - shown_angle[i]) <= dang):
+                continue
+
+            flags[i] = f | SHOWN
+            shown_x[i], shown_y[i], shown_angle[i] = nx, ny, na
+            obj.show(nx, ny, na)
@@ -0,0 +1,61 @@
+"""
+    game clock: time of game goes on by physics steps, not by real time.
+    Events scheduled by game objects are called between physics steps, so
+    game runs the same with any frame rate, or without window at all
+"""
+
+
+class VirtualEvent(object):
+    """ event scheduled on VirtualClock, compatible with kivy's ClockEvent """
+
+    def __init__(self, clock, callback, timeout, interval):
+        self.callback = callback
+        self.timeout = timeout
+        self.interval = interval
+        self.last = clock.time
+        self.deadline = clock.time + max(timeout, 0)
+        self.is_triggered = True
+
+    def cancel(self):
+        self.is_triggered = False
+
+
+class VirtualClock(object):
+    """ clock which time goes on only when tick() is called """
+
+    def __init__(self):
+        self.time = 0.0
+        self.events = []
+
+    def get_time(self):
+        return self.time
+
+    def schedule_once(self, callback, timeout=0):
+        ev = VirtualEvent(self, callback, timeout, interval=False)
+        self.events.append(ev)
+        return ev
+
+    def schedule_interval(self, callback, timeout):
+        ev = VirtualEvent(self, callback, timeout, interval=True)
+        self.events.append(ev)
+        return ev
+
+    def tick(self, dt):
+        """ move time by dt and call events which are due. Events scheduled
+            during tick are called in next tick at earliest, like in kivy """
+        self.time += dt
+        events, self.events = self.events, []
+        for ev in events:
+            if not ev.is_triggered:
+                continue
+            if ev.deadline > self.time + 1e-9:
+                self.events.append(ev)
+                continue
+
+            ret = ev.callback(self.time - ev.last)
+            ev.last = self.time
+            if ev.interval and ev.is_triggered and ret is not False:
+                ev.deadline += ev.timeout
+                self.events.append(ev)
+            else:
+                ev.is_triggered = False
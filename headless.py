@@ -0,0 +1,125 @@
+"""
+    headless game - game logic without visible window or GL, driven by
+    virtual clock and scripted input, as fast as it can run
+
+    usage: python headless.py [easy|medium|hard] [number of steps]
+"""
+
+import os
+import random
+import sys
+import time
+
+# has to be set before kivy is imported: invisible window, no GL calls, no sleeping between frames
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from kivy.config import Config  # noqa: E402
+Config.set('graphics', 'maxfps', '0')
+
+from kivy.clock import Clock  # noqa: E402
+from kivy.lang import Builder  # noqa: E402
+from kivy.logger import Logger  # noqa: E402
+from kivy.uix.widget import Widget  # noqa: E402
+
+from alcangame import AlcanGame  # noqa: E402
+import defs  # noqa: E402
+
+
+class Simulation(object):
+    """
+        one headless game, more of them can run side by side
+
+        Each step() is one physics step, 1/defs.physics_rate of game time. Input is list of
+        (action, value) tuples, the same which game records:  ('move', dx), ('aim', angle),
+        ('shoot', None), ('drop', None)
+    """
+
+    kv_loaded = False
+
+    def __init__(self, level='medium', seed=None, replay=None, difficulty=None):
+        if not Simulation.kv_loaded:
+            Builder.load_file('alcan.kv')
+            Builder.load_file('game.kv')
+            Simulation.kv_loaded = True
+
+        self.game = AlcanGame(level=level, difficulty=difficulty, seed=seed, replay=replay, autorun=False)
+        self.root = Widget()  # game initializes itself once it has parent
+        self.root.add_widget(self.game)
+        self.steps = 0
+
+    @property
+    def is_over(self):
+        return self.game.game_is_over
+
+    def step(self, actions=()):
+        self.game.inputs.extend(actions)
+        self.game.update(1.0 / defs.physics_rate)
+        Clock.tick()  # kivy's own triggers, eg. label textures
+        self.steps += 1
+
+    def run(self, steps, script=None):
+        """ run up to steps, or until game is over. script(simulation) returns
+            actions for next step """
+        for __ in range(steps):
+            if self.is_over:
+                break
+            self.step(script(self) if script else ())
+        return self.steps
+
+    def close(self):
+        self.root.remove_widget(self.game)
+        self.game.clear()
+
+
+class Bot(object):
+    """
+        plays the game: walks to nearest element lying in the zone, carries it
+        to the cannon, aims to the collider and shoots
+    """
+
+    cannon_x = 440
+    aim_range = (-55, -25)
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)  # own, bot doesn't change random numbers of game or others
+        self.target_aim = self.rng.uniform(*self.aim_range)
+
+    def __call__(self, sim):
+        game = sim.game
+        wizard = game.wizard
+        wx = wizard.center_x
+
+        if game.cannon.bullets:
+            da = self.target_aim - game.cannon.aim
+            if abs(da) > 3:
+                return [('aim', max(-3, min(3, da)))]
+            self.target_aim = self.rng.uniform(*self.aim_range)
+            return [('shoot', None)]
+
+        if wizard.carried_elements:
+            tx = self.cannon_x
+        else:
+            lying = [e for e in game.elements_in_zone if not e.activated and e.wizard is None]
+            if not lying:
+                return []
+            tx = min(lying, key=lambda e: abs(e.center_x - wx)).center_x
+
+        dx = tx - wx
+        if abs(dx) < 5:
+            return []
+        return [('move', max(-20, min(20, dx / 4)))]
+
+
+if __name__ == '__main__':
+    level = sys.argv[1] if len(sys.argv) > 1 else 'medium'
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    sim = Simulation(level)
+    started = time.perf_counter()
+    done = sim.run(steps, Bot(sim.game.world.seed))
+    elapsed = time.perf_counter() - started
+    Logger.info("headless: %s steps (%.0f s of game) in %.2f s, %.0f steps/s, points=%s",
+                done, done / defs.physics_rate, elapsed, done / elapsed, sim.game.points)
+    sim.close()
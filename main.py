@@ -1,46 +1,47 @@
 import os
-import time
+import sys
+from os.path import dirname
+from threading import Thread
+
+import timing
 
-from cymunk import BoxShape, PivotJoint, Vec2d
 from kivy.app import App
 from kivy.clock import Clock
-from kivy.core.window import Window
+from kivy.lang import Builder
 from kivy.logger import Logger
-from kivy.properties import NumericProperty
 from kivy.uix.screenmanager import ScreenManager
 
-import sys
-from os.path import dirname
 sys.path.append(dirname(__file__))
-print("sys.path=", sys.path)
 
-from alcangame import AlcanGame
-from anim import AnimObject
+import assets
 import defs
-from element import Element
-from snd import load_sounds
+import ui  # noqa: F401, IntroLabel
 from utils import configure_logger
 
+timing.mark("kivy imported")
 
-class Beam(AnimObject):
-    def add_body(self, dt=None):
-        super(Beam, self).add_body(dt=dt)
-        if self.body:  # if obj is initialized ye
-            self.body.velocity_limit = 0
 
+def load_game():
+    """ import game (physics, elements...) and load its kv rules, once """
+    if load_game.cls is None:
+        from alcangame import AlcanGame
+        timing.mark("game imported")
+        Builder.load_file('game.kv')
+        timing.mark("game rules loaded")
+        load_game.cls = AlcanGame
+    return load_game.cls
 
-class Platform(AnimObject):
-    angle = NumericProperty(0)
 
-    def create_shape(self):
-        sx, sy = self.size
-        shape = BoxShape(self.body, sx, sy)
-        shape.elasticity = 0.6
-        shape.friction = defs.friction
-        shape.collision_type = self.collision_type
-        # shape.layers = defs.NORMAL_LAYER
+load_game.cls = None
 
-        return shape
+
+def prewarm():
+    """ import game modules in background, while user reads intro """
+    def imports():
+        import alcangame  # noqa: F401
+        Clock.schedule_once(lambda dt: load_game())
+
+    Thread(target=imports, name="prewarm", daemon=True).start()
 
 
 class AlcanSM(ScreenManager):
@@ -50,27 +51,14 @@ class AlcanSM(ScreenManager):
     #    self.game_clock = None
 
 
-    def play(self, level):
+    def play(self, level, **kwargs):
+        """ start game, kwargs are passed to it """
         self.game_clock = None
         self.current = 'game'
 
-        if level == 'easy':
-            defs.explode_when_nocomb = 0.9
-            defs.drop_useless_chance = 0.0
-            defs.left_beam_fine_pos = - 130
-            defs.beam_speed = 10
-        elif level == 'medium':
-            defs.explode_when_nocomb = 0.5
-            defs.drop_useless_chance = 0.3
-            defs.left_beam_fine_pos = -10
-            defs.beam_speed = 20
-        elif level == 'hard':
-            defs.explode_when_nocomb = 0.01
-            defs.drop_useless_chance = 0.45
-            defs.left_beam_fine_pos = +5
-            defs.beam_speed = 60
-
-        App.get_running_app().game = AlcanGame()
+        App.get_running_app().game = load_game()(level=level, **kwargs)
+        timing.mark("game created")
+        assets.log_stats()  # misses so far are sprites of kv rules which were not preloaded in time
 
         self.gameuberlayout.add_widget(App.get_running_app().game)
 
@@ -86,7 +74,6 @@ class AlcanSM(ScreenManager):
         self.gameuberlayout.remove_widget(game)
         game.clear()
         del(game)
-        Element.reset()
         self.current = 'main'
 
 
@@ -94,9 +81,16 @@ class AlcanApp(App):
     def build(self):
         # Window.size = defs.map_size
 
+        self.preloader = assets.Preloader()  # textures and sounds, while intro is shown
+        self.preloader.start()
         self.sm = AlcanSM()
+        timing.mark("intro built")
         return self.sm
 
+    def on_start(self):
+        timing.mark("app started")
+        prewarm()
+
     def on_pause(self):
        Logger.info("app: on pause calledd")
        return True
@@ -124,6 +118,12 @@ if __name__ == '__main__':
         import signal
         signal.signal(signal.SIGINT, debug_signal_handler)
 
+    if "RECORD" in os.environ:
+        defs.record_dir = os.environ["RECORD"]
+        Logger.info("replay: games are recorded to %s", defs.record_dir)
+
+    if timing.enabled:
+        Logger.info("timing: enabled, stats are dumped at game over or with F12")
+
     configure_logger()
-    load_sounds()
     AlcanApp().run()
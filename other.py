@@ -1,4 +1,6 @@
+from cymunk import BoxShape
 from kivy.app import App
+from kivy.properties import NumericProperty
 from kivy.uix.boxlayout import BoxLayout
 
 from anim import AnimObject
@@ -12,6 +14,8 @@ class Hint(BoxLayout):
 
 
 class GameOver(AnimObject):
+    points = NumericProperty(0)
+
     def __init__(self, *a, **kw):
         super(GameOver, self).__init__(*a, **kw)
         self.layers = -1 - defs.CARRIED_THINGS_LAYER
@@ -21,6 +25,27 @@ class GameOver(AnimObject):
 
 
 class Success(BoxLayout):
+    points = NumericProperty(0)
 
     def on_touch_up(self, touch):
         App.get_running_app().root.gameover()
+
+
+class Beam(AnimObject):
+    def add_body(self):
+        super(Beam, self).add_body()
+        self.body.velocity_limit = 0
+
+
+class Platform(AnimObject):
+    angle = NumericProperty(0)
+
+    def create_shape(self):
+        sx, sy = self.size
+        shape = BoxShape(self.body, sx, sy)
+        shape.elasticity = 0.6
+        shape.friction = defs.friction
+        shape.collision_type = self.collision_type
+        # shape.layers = defs.NORMAL_LAYER
+
+        return shape
@@ -0,0 +1,73 @@
+"""
+    pools of removed game objects, reused instead of creating new widgets,
+    canvases, bodies and shapes for every merge or baloon
+"""
+
+from kivy.logger import Logger
+
+
+class Pool(object):
+    """ free instances of one class, in one world """
+
+    def __init__(self, cls, world):
+        self.cls = cls
+        self.world = world
+        self.free = []
+        self.in_use = 0
+        self.high_water = 0  # max of objects in use at once
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs):
+        """ recycled object, or new one if there is none free """
+        if self.free:
+            obj = self.free.pop()
+            obj.recycle(*args, **kwargs)
+            self.reused += 1
+        else:
+            obj = self.cls(*args, world=self.world, **kwargs)
+            self.created += 1
+
+        obj.acquired = True
+        self.in_use += 1
+        self.high_water = max(self.high_water, self.in_use)
+        return obj
+
+    def release(self, obj):
+        """ obj was removed from game, keep it for later """
+        obj.on_release()
+        if obj.acquired:  # not when it was created directly, without acquire
+            obj.acquired = False
+            self.in_use -= 1
+        self.free.append(obj)
+
+    def stats(self):
+        return {'pool': self.cls.__name__, 'high_water': self.high_water, 'free': len(self.free),
+                'created': self.created, 'reused': self.reused}
+
+
+class Pools(object):
+    """ pools of world, by class """
+
+    def __init__(self, world):
+        self.world = world
+        self.pools = {}
+
+    def pool(self, cls):
+        """ pool of class cls """
+        try:
+            return self.pools[cls]
+        except KeyError:
+            ret = self.pools[cls] = Pool(cls, self.world)
+            return ret
+
+    def stats(self):
+        return [self.pools[cls].stats() for cls in sorted(self.pools, key=lambda cls: cls.__name__)]
+
+    def log_stats(self):
+        for s in self.stats():
+            Logger.info("pool: %(pool)s high water %(high_water)s, created %(created)s, reused %(reused)s", s)
+
+    def clear(self):
+        """ forget all pooled objects, when their space is gone """
+        self.pools.clear()
@@ -0,0 +1,147 @@
+"""
+    recordings of games - seed of game's random numbers, level and inputs
+    of each physics step. Game logic runs on game clock and game's random
+    numbers only, and reads state of physics, never of widgets, which are
+    interpolated between steps by frame rate. So recording plays the game
+    again exactly, and ends in the state recorded with it.
+
+    usage: python replay.py recording.json [--real]
+           python replay.py --check [level] [steps]
+
+    replays as fast as it can without window, or with --real in window,
+    at real speed. --check plays game by bot at irregular frame rate, as
+    in window, and replays it without window, to the same final state
+"""
+
+from collections import defaultdict
+import json
+import os
+import random
+import sys
+import time
+
+
+class Recording(object):
+    """ inputs of one game, as (physics step, action, value) """
+
+    def __init__(self, seed, level, inputs=(), steps=0, final=None):
+        self.seed = seed
+        self.level = level
+        self.inputs = [tuple(x) for x in inputs]
+        self.steps = steps  # number of physics steps game ran
+        self.final = final  # AlcanGame.snapshot() after last step
+        self.by_step = None
+
+    def add(self, step, action, value):
+        self.inputs.append((step, action, value))
+
+    def actions(self, step):
+        """ list of (action, value) of physics step """
+        if self.by_step is None:
+            self.by_step = defaultdict(list)
+            for s, action, value in self.inputs:
+                self.by_step[s].append((action, value))
+        return self.by_step.get(step, ())
+
+    def save(self, fname):
+        with open(fname, 'w') as f:
+            json.dump({'seed': self.seed, 'level': self.level, 'steps': self.steps,
+                       'inputs': self.inputs, 'final': self.final}, f, separators=(',', ':'))
+
+    def save_to_dir(self, dirname):
+        """ save as new file in dirname, return its name """
+        os.makedirs(dirname, exist_ok=True)
+        fname = os.path.join(dirname, "game-%s-%s.json" % (time.strftime("%Y%m%d-%H%M%S"), self.seed))
+        self.save(fname)
+        return fname
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname) as f:
+            data = json.load(f)
+        return cls(data['seed'], data['level'], data['inputs'], data['steps'], data.get('final'))
+
+
+def same_state(a, b):
+    """ snapshots are equal, also when one of them went through json """
+    return json.loads(json.dumps(a)) == json.loads(json.dumps(b))
+
+
+def replay_headless(recording):
+    """ play recording as fast as possible, eg. for profiling. Return final
+        snapshot of game, and check it with the recorded one """
+    from headless import Simulation
+    from kivy.logger import Logger
+
+    sim = Simulation(recording.level, seed=recording.seed, replay=recording)
+    started = time.perf_counter()
+    for __ in range(recording.steps):
+        sim.step()
+    elapsed = time.perf_counter() - started
+    Logger.info("replay: %s steps in %.2f s, %.0f steps/s, points=%s, game over=%s",
+                sim.steps, elapsed, sim.steps / elapsed, sim.game.points, sim.is_over)
+
+    final = sim.game.snapshot()
+    sim.close()
+    if recording.final is not None and not same_state(final, recording.final):
+        Logger.warning("replay: final state differs from recorded one\n  recorded %s\n  replayed %s",
+                       recording.final, final)
+    return final
+
+
+def check(level='medium', steps=3000, seed=0):
+    """ bot plays game, updated by frames of irregular length like in window, so
+        that widgets are interpolated at all kinds of fractions of step. Then its
+        recording is replayed without window, by whole physics steps. Return
+        True when both end in the same state """
+    from headless import Bot, Simulation
+    from kivy.clock import Clock
+    from kivy.logger import Logger
+    import defs
+
+    frames = random.Random(seed)
+    sim = Simulation(level, seed=seed)
+    game = sim.game
+    bot = Bot(seed)
+    while game.step_no < steps and not sim.is_over:
+        game.inputs.extend(bot(sim))
+        game.update(frames.uniform(0.2, 3.0) / defs.fps)
+        Clock.tick()
+
+    recording = game.recording
+    recording.steps = game.step_no
+    recording.final = game.snapshot()
+    sim.close()
+
+    ok = same_state(replay_headless(recording), recording.final)
+    Logger.info("replay: check of %s steps and %s inputs %s", recording.steps, len(recording.inputs),
+                "passed" if ok else "FAILED")
+    return ok
+
+
+def replay_in_window(recording):
+    """ play recording in game window, at real speed. Player's input is ignored """
+    from main import AlcanApp
+
+    class ReplayApp(AlcanApp):
+        kv_file = 'alcan.kv'
+
+        def on_start(self):
+            super(ReplayApp, self).on_start()
+            self.sm.play(recording.level, seed=recording.seed, replay=recording)
+
+    ReplayApp().run()
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    if sys.argv[1] == '--check':
+        args = sys.argv[2:]
+        ok = check(args[0] if args else 'medium', int(args[1]) if len(args) > 1 else 3000)
+        sys.exit(0 if ok else 1)
+
+    recording = Recording.load(sys.argv[1])
+    if '--real' in sys.argv[2:]:
+        replay_in_window(recording)
+    else:
+        replay_headless(recording)
@@ -1,9 +1,21 @@
 from kivy.core.audio import SoundLoader
 
+SOUNDS = {'merge': "sfx/merge.ogg"}  # attribute of Sounds -> file
+
 
 class Sounds:
     merge = None
 
 
-def load_sounds():
-    Sounds.merge = SoundLoader.load("sfx/merge.ogg")
+def decode_sounds():
+    """ read and decode sound files, into dict name -> sound. Doesn't touch
+        Sounds, so it can run in background thread """
+    return {name: SoundLoader.load(fname) for name, fname in SOUNDS.items()}
+
+
+def load_sounds(sounds=None):
+    """ make sounds (decoded by decode_sounds, or now) available to game """
+    if sounds is None:
+        sounds = decode_sounds()
+    for name, sound in sounds.items():
+        setattr(Sounds, name, sound)
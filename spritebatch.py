@@ -0,0 +1,165 @@
+"""
+    batched drawing of elements
+
+    All elements are drawn with a few meshes, which are refilled once per
+    frame from QuadBuffers: one with discs under the sprites, and one per
+    texture with the sprites (one in total when sprites are packed into the
+    atlas). Disc is a sprite too, of texture made once. Tint of activated
+    elements is per-vertex color, so it needs own shader.
+"""
+
+from array import array
+import struct
+
+from kivy.graphics import InstructionGroup, Mesh, RenderContext
+from kivy.graphics.texture import Texture
+
+# kivy's default shaders, plus color of vertex
+VERTEX_SHADER = """
+$HEADER$
+attribute vec4 vColor;
+
+void main (void) {
+    frag_color = vColor * color * vec4(1.0, 1.0, 1.0, opacity);
+    tex_coord0 = vTexCoords0;
+    gl_Position = projection_mat * modelview_mat * vec4(vPosition.xy, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+$HEADER$
+
+void main (void) {
+    gl_FragColor = frag_color * texture2D(texture0, tex_coord0);
+}
+"""
+
+FMT = [(b'vPosition', 2, 'float'), (b'vTexCoords0', 2, 'float'), (b'vColor', 4, 'float')]
+
+QUAD = struct.Struct('32f')  # 4 vertices of FMT
+
+DISC_SIZE = 64  # pixels of disc texture, it's scaled to size of element
+
+
+def batch_context():
+    """ render context for meshes of FMT, drawn in parent's coordinates """
+    context = RenderContext(use_parent_projection=True, use_parent_modelview=True)
+    context.shader.vs = VERTEX_SHADER
+    context.shader.fs = FRAGMENT_SHADER
+    return context
+
+
+def disc_texture():
+    """ white disc on transparent background, with smooth edge, to be tinted """
+    if disc_texture.data is not None:
+        return disc_texture.data
+
+    pixels = bytearray()
+    r = DISC_SIZE / 2
+    for y in range(DISC_SIZE):
+        for x in range(DISC_SIZE):
+            d = ((x + 0.5 - r) ** 2 + (y + 0.5 - r) ** 2) ** 0.5
+            pixels.extend((255, 255, 255, int(255 * min(1.0, max(0.0, r - d)))))
+    texture = Texture.create(size=(DISC_SIZE, DISC_SIZE), colorfmt='rgba')
+    texture.blit_buffer(bytes(pixels), colorfmt='rgba', bufferfmt='ubyte')
+    disc_texture.data = texture
+    return texture
+
+
+disc_texture.data = None
+
+
+class QuadBuffer(object):
+    """
+        sprites of one texture (atlas page), written into array of vertices
+        which is kept from frame to frame and grows only when there are more
+        sprites than ever before. Vertices of sprite are packed at once.
+    """
+
+    def __init__(self, texture):
+        self.texture = texture
+        self.vertices = array('f', bytes(QUAD.size * 16))
+        self.indices = array('H')
+        self.count = 0  # sprites written since last flush
+
+    def add(self, region, x0, y0, x1, y1, r, g, b, a):
+        """ add sprite of region of texture, drawn over rectangle (x0, y0) - (x1, y1) """
+        n = self.count
+        if (n + 1) * QUAD.size > len(self.vertices) * self.vertices.itemsize:
+            self.vertices.extend(self.vertices)
+        u0, v0, u1, v1, u2, v2, u3, v3 = region.tex_coords
+        QUAD.pack_into(self.vertices, n * QUAD.size,
+                       x0, y0, u0, v0, r, g, b, a,
+                       x1, y0, u1, v1, r, g, b, a,
+                       x1, y1, u2, v2, r, g, b, a,
+                       x0, y1, u3, v3, r, g, b, a)
+        self.count = n + 1
+
+    def flush(self, mesh):
+        """ give sprites written since last flush to mesh, and start again """
+        n = self.count
+        for q in range(len(self.indices) // 6, n):
+            k = 4 * q
+            self.indices.extend((k, k + 1, k + 2, k, k + 2, k + 3))
+        mesh.vertices = self.vertices[:n * 32]
+        mesh.indices = self.indices[:n * 6]
+        self.count = 0
+
+
+def flush_buffers(context, meshes, buffers):
+    """ draw QuadBuffers (texture id -> buffer) with meshes (texture id -> Mesh) in
+        context, one per texture. Meshes of textures without sprites are removed """
+    for tid, buf in buffers.items():
+        mesh = meshes.get(tid)
+        if not buf.count:
+            if mesh is not None:
+                context.remove(meshes.pop(tid))
+            continue
+        if mesh is None:
+            mesh = meshes[tid] = Mesh(fmt=FMT, mode='triangles', texture=buf.texture)
+            context.add(mesh)
+        buf.flush(mesh)
+
+
+class ElementBatch(object):
+    """ draws elements of game, which don't draw themselves, where entity store shows them """
+
+    def __init__(self):
+        self.context = batch_context()
+        self.discs = InstructionGroup()  # below sprites
+        self.sprites = InstructionGroup()
+        self.context.add(self.discs)
+        self.context.add(self.sprites)
+        self.disc = None  # texture, made when elements are drawn first time
+        self.buffers = {}  # texture id -> QuadBuffer, of sprites
+        self.meshes = {}  # texture id -> Mesh
+        self.disc_buffers = {}
+        self.disc_meshes = {}
+
+    def update(self, elements, entities):
+        """ fill meshes with elements, in interpolated state of their bodies in entities """
+        if self.disc is None:
+            self.disc = disc_texture()
+            self.disc_buffers[self.disc.id] = QuadBuffer(self.disc)
+        disc = self.disc
+        discs = self.disc_buffers[disc.id]
+        buffers = self.buffers
+        xs, ys = entities.shown_x, entities.shown_y
+
+        for e in elements:
+            texture = e.texture
+            if texture is None:
+                continue
+            i = e.slot
+            x, y = xs[i], ys[i]
+            rx = ry = e.shape.radius
+            r, g, b, a = e.activated_color if e.activated else e.color
+
+            discs.add(disc, x - rx, y - ry, x + rx, y + ry, r, g, b, a)
+            buf = buffers.get(texture.id)
+            if buf is None:
+                buf = buffers[texture.id] = QuadBuffer(texture)
+            buf.add(texture, x - rx, y - ry, x + rx, y + ry, r, g, b, a)
+
+        flush_buffers(self.discs, self.disc_meshes, self.disc_buffers)
+        flush_buffers(self.sprites, self.meshes, buffers)
@@ -0,0 +1,131 @@
+"""
+    frame timing - named spans with rolling percentiles
+
+    enabled when TIMING is in environment (eg. TIMING=timing.csv), value is
+    file where stats are dumped, .json or .csv, or 1 for timing.json; empty,
+    0, false, no or off disable it. Spans
+    can be nested, also the same span in itself. When disabled, span() returns
+    shared do-nothing context and timed() returns function unchanged, so it
+    must be enabled before game modules are imported.
+
+    mark() logs startup trace, always.
+"""
+
+from collections import deque
+import csv
+from functools import wraps
+import json
+import os
+from time import perf_counter
+
+started = perf_counter()  # import of this module is start of startup trace
+
+from kivy.logger import Logger  # noqa: E402
+
+dump_path = os.environ.get("TIMING", "")
+enabled = dump_path.lower() not in ("", "0", "false", "no", "off")
+if dump_path.lower() in ("1", "true", "yes", "on"):
+    dump_path = "timing.json"
+
+WINDOW = 2000  # number of last samples of each span, which percentiles are computed from
+
+spans = {}
+
+
+class Span(object):
+    __slots__ = ('name', 'count', 'samples', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.samples = deque(maxlen=WINDOW)
+        self.started = []  # stack of start times, span can be entered again before it's left
+
+    def __enter__(self):
+        self.started.append(perf_counter())
+
+    def __exit__(self, *__exc):
+        self.samples.append(perf_counter() - self.started.pop())
+        self.count += 1
+
+    def stats(self):
+        """ percentiles of samples in milliseconds """
+        samples = sorted(self.samples)
+        n = len(samples)
+
+        def percentile(p):
+            return samples[min(n - 1, int(p * n))] * 1000 if n else 0.0
+
+        return {'span': self.name, 'count': self.count,
+                'mean': sum(samples) / n * 1000 if n else 0.0,
+                'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                'max': samples[-1] * 1000 if n else 0.0}
+
+
+class NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *__exc):
+        pass
+
+
+NOSPAN = NoSpan()
+
+
+def span(name):
+    """ context measuring time of named stage:  with span('physics'): ... """
+    if not enabled:
+        return NOSPAN
+    try:
+        return spans[name]
+    except KeyError:
+        ret = spans[name] = Span(name)
+        return ret
+
+
+def timed(name):
+    """ decorator measuring each call of function as span name """
+    def decorator(func):
+        if not enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def mark(stage):
+    """ log time since start, when stage of startup is done """
+    Logger.info("startup: %-24s %6.0f ms", stage, (perf_counter() - started) * 1000)
+
+
+def stats():
+    return [spans[name].stats() for name in sorted(spans)]
+
+
+def reset():
+    spans.clear()
+
+
+def dump(path=None):
+    """ write stats of all spans to path (.csv or .json) """
+    if not enabled:
+        return
+    path = path or dump_path
+    rows = stats()
+
+    with open(path, 'w') as f:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=['span', 'count', 'mean', 'p50', 'p95', 'p99', 'max'])
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=1)
+
+    Logger.info("timing: stats of %s spans dumped to %s", len(rows), path)
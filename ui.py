@@ -1,41 +1,58 @@
+from functools import lru_cache
+
 from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
 from kivy.logger import Logger
 from kivy.uix.button import Button
 
-def opposite(x, y):
-    return x < 0 and y > 0 or x > 0 and y < 0
+
+def text_extents(text, font_name, font_size, width=None, halign='left'):
+    """ (width, height) of text laid out in font, wrapped to width.
+        Only measures glyphs, no texture is rendered """
+    label = CoreLabel(text=text, font_name=font_name, font_size=font_size,
+                      text_size=(width, None), halign=halign)
+    label.resolve_font_name()
+    return label.render()
+
+
+@lru_cache(maxsize=64)
+def fit_font_size(text, font_name, box, halign='left', min_size=6, max_size=200):
+    """
+        biggest font size (in whole pixels) text fits into box (width, height) with,
+        wrapped to width of box. Binary search between min_size and max_size
+    """
+    w, h = box
+    lo, hi = min_size, max_size
+    while lo < hi:
+        size = (lo + hi + 1) // 2
+        tw, th = text_extents(text, font_name, size, w, halign)
+        if tw <= w and th <= h:
+            lo = size
+        else:
+            hi = size - 1
+    Logger.debug("ui: font size %s fits %r into %s", lo, text[:20], box)
+    return lo
+
+
+def fit_label(label, **kwargs):
+    """ set font_size of label, so that its text fills its size """
+    w, h = label.size
+    if w <= 0 or h <= 0 or not label.text:
+        return
+    label.font_size = fit_font_size(label.text, label.font_name, (int(w), int(h)),
+                                    label.halign, **kwargs)
+
 
 class IntroLabel(Button):
     def __init__(self, *a, **kw):
+        self.trigger_fit = Clock.create_trigger(self.adjust_size, 0)
         super().__init__(*a, **kw)
-    
-    def on_size(self, label, size):
-        Clock.schedule_once(self.adjust_size, 0)
-        
-    def adjust_size(self, dt):
-
-        step = 3
-
-        while True:
-            w, h = self.size
-            tw, th = self.texture_size
-            
-            Logger.debug("tw=%s w=%s th=%s h=%s step=%s", tw, w, th, h, step)
-           
-            dir_dfs = -1 if (tw > w or th > h) else 1
-
-            if opposite(dir_dfs, step):
-                step *= -0.5
-                Logger.debug("step set to %s", step)
-
-            if abs(step) < 0.1:
-                Logger.debug("reached finish")
-                break
-
-            self.font_size += step
-            Logger.debug("font_size=%s", self.font_size)
-            self.texture_update()
-            
 
+    def on_size(self, label, size):
+        self.trigger_fit()
 
+    def on_text(self, label, text):
+        self.trigger_fit()
 
+    def adjust_size(self, __dt=None):
+        fit_label(self)
@@ -1,5 +1,7 @@
+import json
 import logging
-from random import sample
+import os
+import random
 # from logging.handlers import DatagramHandler
 # from logging.handlers import SysLogHandler
 import weakref
@@ -12,9 +14,43 @@ def adhoco(**kwargs):
     return type('adhoc_object', (object,), dict(**kwargs))
 
 
-def shuffled(container):
-    lcon = list(container)
-    return sample(lcon, len(lcon))
+def choice_bit(mask, rng=random):
+    """ index of random bit which is set in (nonzero) mask, chosen by rng """
+    k = rng.randrange(bin(mask).count('1'))
+    while True:
+        low = mask & -mask
+        if not k:
+            return low.bit_length() - 1
+        mask ^= low
+        k -= 1
+
+ATLAS = "img/sprites.atlas"  # made by make atlas
+
+
+def atlas_pages():
+    """ dict image of page -> {sprite name: (x, y, w, h)} of sprites atlas,
+        empty when atlas is not built """
+    if atlas_pages.data is None:
+        atlas_pages.data = {}
+        if os.path.exists(ATLAS):
+            with open(ATLAS) as f:
+                for fname, regions in json.load(f).items():
+                    atlas_pages.data[os.path.join(os.path.dirname(ATLAS), fname)] = regions
+            Logger.info("utils: %s sprites in %s", sum(map(len, atlas_pages.data.values())), ATLAS)
+    return atlas_pages.data
+
+
+atlas_pages.data = None
+
+
+def imgsrc(name):
+    """ source of sprite name: region of texture atlas (make atlas), or separate
+        img/name.png when it's not packed """
+    for regions in atlas_pages().values():
+        if name in regions:
+            return "atlas://" + os.path.splitext(ATLAS)[0] + "/" + name
+    return "img/" + name + ".png"
+
 
 # def observe(obj):
 #     try:
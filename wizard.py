@@ -1,5 +1,3 @@
-import time
-
 from cymunk import Vec2d
 from kivy.logger import Logger
 
@@ -19,7 +17,7 @@ class Wizard(AnimObject):
         self.applied_force = Vec2d(0, 0)
 
     def carry_element(self, element, __dt=None):
-        if time.time() - element.released_at < 1.0:
+        if self.get_time() - element.released_at < 1.0:
             return True
         # move element to "carried elements layer"
         element.shape.layers = defs.CARRIED_THINGS_LAYER
@@ -33,10 +31,9 @@ class Wizard(AnimObject):
         self.carried_elements.append(element)
         element.wizard = self
 
-    def add_body(self, dt=None):
-        super(Wizard, self).add_body(dt=dt)
-        if self.body:  # if obj is initialized ye
-            self.body.velocity_limit = defs.wizard_max_speed
+    def add_body(self):
+        super(Wizard, self).add_body()
+        self.body.velocity_limit = defs.wizard_max_speed
 
     def create_shape(self):
         shape = super(Wizard, self).create_shape()
@@ -51,7 +48,7 @@ class Wizard(AnimObject):
             x.body.apply_impulse(defs.wizard_release_impulse)
             x.unjoint()
             x.shape.layers = defs.NORMAL_LAYER
-            x.released_at = time.time()
+            x.released_at = self.get_time()
 
         if self.touching_elements:
             self.carry_element(self.touching_elements[0])
@@ -0,0 +1,151 @@
+"""
+    world of one game - physics space and bodies, game clock and events
+    scheduled on it, random numbers, discovered elements, pools of removed
+    objects and difficulty. Game objects reach it by their world attribute,
+    so more games, each with own world, can run side by side
+"""
+
+import random
+
+from cymunk import Segment, Space, Vec2d
+
+import defs
+from element import Discovery
+from entities import EntityStore
+import gameclock
+import pool
+import timing
+
+
+class Difficulty(object):
+    """ parameters of level: defaults from defs, with those of level, and overrides """
+
+    def __init__(self, level, overrides=None):
+        for name in defs.DIFFICULTY:
+            setattr(self, name, getattr(defs, name))
+        vars(self).update(defs.LEVELS[level])
+        for name, value in (overrides or {}).items():
+            if name not in defs.DIFFICULTY:
+                raise ValueError("unknown difficulty parameter %r" % name)
+            setattr(self, name, value)
+
+
+class World(object):
+
+    def __init__(self, level='medium', seed=None, difficulty=None):
+        """ seed - of world's random numbers, random if None
+            difficulty - dict of parameters to change in those of level """
+        self.level = level
+        self.difficulty = Difficulty(level, difficulty)
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng = random.Random(self.seed)
+        self.clock = gameclock.VirtualClock()
+        self.clocks = []  # events to cancel when world is closed
+        self.discovery = Discovery()
+        self.pools = pool.Pools(self)
+        self.init_physics()
+
+    # physics
+
+    def init_physics(self):
+        self.space = Space()
+        self.bodyobjects = {}  # body -> game object
+        self.entities = EntityStore()  # position and angle of bodies
+        self.accumulator = 0.0  # game time not simulated yet, less than one physics step
+        self.stepping = False  # space is locked, while it's stepping
+        self.after_step = []  # functions to call when space is unlocked, see when_unlocked
+        self.space.gravity = defs.gravity
+        self.space.sleep_time_threshold = defs.sleep_time_threshold
+
+        ra = 100
+        w, h = defs.map_size
+
+        for x1, y1, x2, y2, ct in [
+                (-100, defs.floor_level - ra, w + 100, defs.floor_level - ra, defs.BOTTOM_BOUND),
+                (-ra, h + 100, -ra, -100, defs.LEFT_BOUND),
+                (w + ra, h + 100, w + ra, -100, defs.RIGHT_BOUND)
+              ]:
+            wall = Segment(self.space.static_body, Vec2d(x1, y1), Vec2d(x2, y2), ra)
+            wall.elasticity = 0.6
+            wall.friction = defs.friction
+            wall.collision_type = ct
+            self.space.add_static(wall)
+
+    def physics_steps(self, dt):
+        """ number of physics steps to do, for frame which took dt """
+        step = 1.0 / defs.physics_rate
+        self.accumulator = min(self.accumulator + dt, defs.max_physics_steps * step)
+        n = int(self.accumulator / step + 1e-6)
+        self.accumulator = max(0.0, self.accumulator - n * step)
+        return n
+
+    def step_space(self):
+        """ one physics step of 1/physics_rate, remember previous state for interpolation """
+        self.entities.save_previous()
+
+        substep = 1.0 / defs.physics_rate / defs.physics_substeps
+        with timing.span('physics.step'):
+            for __ in range(defs.physics_substeps):
+                self.stepping = True
+                try:
+                    self.space.step(substep)
+                finally:
+                    self.stepping = False
+                self.run_after_step()
+
+        with timing.span('physics.refresh'):
+            self.entities.refresh()
+
+    def when_unlocked(self, func):
+        """ call func, which adds bodies to space, now or after space step when
+            it's called during one (eg. from collision handler) """
+        if self.stepping:
+            self.after_step.append(func)
+        else:
+            func()
+
+    def run_after_step(self):
+        while self.after_step:
+            funcs, self.after_step = self.after_step, []
+            for func in funcs:
+                func()
+
+    def update_to_bodies(self):
+        """ update widgets of moving bodies, interpolated between last two physics states """
+        alpha = self.accumulator * defs.physics_rate
+        with timing.span('physics.sync'):
+            self.entities.sync(alpha)
+
+    # game clock
+
+    def schedule_once(self, *args, **kwargs):
+        ev = self.clock.schedule_once(*args, **kwargs)
+        self.clocks.append(ev)
+        self.clocks_cleanup()
+        return ev
+
+    def schedule_interval(self, *args, **kwargs):
+        self.clocks.append(self.clock.schedule_interval(*args, **kwargs))
+        self.clocks_cleanup()
+
+    def get_time(self):
+        """ game time, in seconds """
+        return self.clock.get_time()
+
+    def stop_all_clocks(self):
+        for event in self.clocks:
+            event.cancel()
+        self.clocks_cleanup()
+
+    def clocks_cleanup(self):
+        for ev in self.clocks[:]:
+            if not ev.is_triggered:
+                self.clocks.remove(ev)
+
+    def close(self):
+        """ game is over, stop everything and forget objects """
+        self.stop_all_clocks()
+        self.pools.log_stats()
+        self.pools.clear()
+        self.bodyobjects.clear()
+        self.space = None